@@ -0,0 +1,921 @@
+from textual.app import ComposeResult
+from textual.containers import Container
+from textual.screen import Screen
+from textual.widgets import (
+    Button,
+    Digits,
+    Header,
+    Footer,
+    Input,
+    Static,
+)
+from textual.worker import Worker
+import asyncio
+from os import getenv
+from time import perf_counter
+
+from client import CONNECTION_ERRORS, AsyncClient
+from pool import POOL
+from widgets import (
+    ERROR1_TEXT,
+    ERROR2_TEXT,
+    ERROR3_TEXT,
+    ERROR131_TEXT,
+    ERROR132_TEXT,
+    ERROR133_TEXT,
+    ERROR252_TEXT,
+    Timeout,
+    clear_errors,
+    clear_fields,
+    handle_incomplete_fields_error,
+    update_hidden,
+)
+
+
+class BankLogin(Screen):
+    TEXT = 'Welcome to TeleGods Bank, where your financial security is our top priority!\n\nIf you\'re a new user, click on the "Register" button to create an account and explore the world of the TeleGods Bank.\n\nThank you for choosing TeleGods Bank!'
+    username = ""
+    password = ""
+
+    def __init__(self, client: AsyncClient):
+        super().__init__()
+        self.client = client
+
+    def compose(self) -> ComposeResult:
+        yield Header(show_clock=True)
+        yield Footer()
+        yield Container(
+            Static(self.TEXT, classes="text"),
+            Static(ERROR1_TEXT, id="error1", classes="text error hidden"),
+            Static(
+                ERROR131_TEXT,
+                id="error131",
+                classes="text error hidden",
+            ),
+            Input(
+                placeholder="Username",
+                id="username",
+                restrict=r"^[a-zA-Z0-9_]+$",
+                valid_empty=False,
+            ),
+            Input(
+                placeholder="Password",
+                id="password",
+                valid_empty=False,
+                password=True,
+            ),
+            Container(
+                Button(
+                    label="Log in",
+                    variant="success",
+                    id="login",
+                    classes="large-button",
+                ),
+                Button(
+                    label="Register",
+                    variant="primary",
+                    id="register",
+                    classes="large-button",
+                ),
+                Button(
+                    label="Disconnect",
+                    variant="error",
+                    id="disconnect",
+                    classes="large-button",
+                ),
+                classes="horizontal-selection",
+            ),
+            classes="centered-container",
+        )
+
+    def on_screen_resume(self) -> None:
+        # Clear fields on resume
+        clear_fields(self.screen, ["#username", "#password"])
+
+        # Clear errors
+        clear_errors(self.screen, ["#error1", "#error131"])
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "username":
+            self.username = event.value
+        elif event.input.id == "password":
+            self.password = event.value
+
+    async def on_button_pressed(self, event: Button.Pressed) -> None:
+        # Get button ID and validate it
+        button_id = event.button.id
+        if button_id is None:
+            return
+
+        match button_id:
+            case "disconnect":
+                # The connection stays warm in the pool for the next visit
+                POOL.release(self.client)
+                self.app.pop_screen()
+
+            case "login":
+                # Clear remaining errors
+                clear_errors(self.screen, ["#error1", "#error131"])
+
+                # Handle incomplete fields error
+                error_code = handle_incomplete_fields_error(
+                    [self.username, self.password]
+                )
+                update_hidden(error_code == 0, self.query_one("#error131"))
+                if error_code == 131:
+                    return
+
+                # Send login and handle error
+                try:
+                    error_code, uuid = await self.client.login(
+                        self.username, self.password
+                    )
+                except CONNECTION_ERRORS:
+                    self.app.push_screen(Timeout())
+                    return
+                update_hidden(error_code == 0, self.query_one("#error1"))
+                if error_code == 0:
+                    self.app.push_screen(BankMainMenu(self.client, uuid, self.username))
+
+            case "register":
+                self.app.push_screen(BankRegister(self.client))
+
+
+class BankRegister(Screen):
+    TEXT = "Please provide a unique username containing only letters (a-z, A-Z), numbers (0-9), or underscores (_).\n\nIf you already have an account, click on the 'Back' button and log in your TeleGods Bank account."
+    ERROR0 = "User succesfully registered, you can now go back and log in"
+    username = ""
+    password = ""
+    confirm_password = ""
+
+    def __init__(self, client: AsyncClient):
+        super().__init__()
+        self.client = client
+
+    def compose(self) -> ComposeResult:
+        yield Header(show_clock=True)
+        yield Footer()
+        yield Container(
+            Static(self.TEXT, classes="text"),
+            Static(self.ERROR0, id="error0", classes="text success hidden"),
+            Static(ERROR2_TEXT, id="error2", classes="text error hidden"),
+            Static(ERROR131_TEXT, id="error131", classes="text error hidden"),
+            Static(ERROR132_TEXT, id="error132", classes="text error hidden"),
+            Input(
+                placeholder="Username",
+                id="username",
+                restrict=r"^[a-zA-Z0-9_]+$",
+                valid_empty=False,
+            ),
+            Input(
+                placeholder="Password",
+                id="password",
+                valid_empty=False,
+                password=True,
+            ),
+            Input(
+                placeholder="Confirm your password",
+                id="confirm-password",
+                valid_empty=False,
+                password=True,
+            ),
+            Container(
+                Button(
+                    label="Register",
+                    variant="success",
+                    id="register",
+                    classes="large-button",
+                ),
+                Button(
+                    label="Back",
+                    variant="error",
+                    id="back",
+                    classes="large-button",
+                ),
+                classes="horizontal-selection",
+            ),
+            classes="centered-container",
+        )
+
+    def on_screen_resume(self) -> None:
+        # Clear fields on resume
+        clear_fields(self.screen, ["#username", "#password", "#confirm-password"])
+
+        # Clear errors and success message
+        clear_errors(self.screen, ["#error0", "#error2", "#error131", "#error132"])
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "username":
+            self.username = event.value
+        elif event.input.id == "password":
+            self.password = event.value
+        elif event.input.id == "confirm-password":
+            self.confirm_password = event.value
+
+    async def on_button_pressed(self, event: Button.Pressed) -> None:
+        # Get button ID and validate it
+        button_id = event.button.id
+        if button_id is None:
+            return
+
+        match button_id:
+            case "back":
+                self.app.pop_screen()
+
+            case "register":
+                # Clear errors and success message
+                clear_errors(
+                    self.screen, ["#error0", "#error2", "#error131", "#error132"]
+                )
+
+                # Handle incomplete fields error
+                error_code = handle_incomplete_fields_error(
+                    [self.username, self.password, self.confirm_password]
+                )
+                if error_code == 131:
+                    update_hidden(error_code != 131, self.query_one("#error131"))
+                    return
+
+                # Handle password mismatch
+                if self.password != self.confirm_password:
+                    error_code = 132
+                    update_hidden(error_code != 132, self.query_one("#error132"))
+                    return
+
+                # Send login and handle error
+                try:
+                    error_code, _ = await self.client.register(
+                        self.username, self.password
+                    )
+                except CONNECTION_ERRORS:
+                    self.app.push_screen(Timeout())
+                    return
+                update_hidden(error_code != 2, self.query_one("#error2"))
+
+                # Show success message
+                update_hidden(error_code != 0, self.query_one("#error0"))
+
+
+class BankBalance(Screen):
+    def __init__(self, balance: str):
+        super().__init__()
+        self.balance = balance
+        self.TEXT = "Your current balance is:"
+
+    def compose(self) -> ComposeResult:
+        yield Header(show_clock=True)
+        yield Footer()
+        yield Container(
+            Static(self.TEXT, classes="text"),
+            Digits(f"{self.balance}  ＴＣ (TeleCredits)", classes="text"),
+            Button(label="Back", variant="error", id="back", classes="large-button"),
+            classes="centered-container",
+        )
+
+    def on_button_pressed(self, _: Button.Pressed) -> None:
+        self.app.pop_screen()
+
+
+class BankDeposit(Screen):
+    def __init__(self, client: AsyncClient, uuid):
+        super().__init__()
+        self.client = client
+        self.TEXT = (
+            "Please enter the amount of money you want to deposit into your account"
+        )
+        self.ERROR0 = "Succesfully deposited the amount into your account balance"
+        self.amount = ""
+        self.uuid = uuid
+
+    def compose(self) -> ComposeResult:
+        yield Header(show_clock=True)
+        yield Footer()
+        yield Container(
+            Static(self.TEXT, classes="text"),
+            Static(self.ERROR0, id="error0", classes="text success hidden"),
+            Static(ERROR131_TEXT, id="error131", classes="text error hidden"),
+            Static(ERROR133_TEXT, id="error133", classes="text error hidden"),
+            Input(
+                placeholder="Amount",
+                id="amount",
+                valid_empty=False,
+                restrict=r"[0-9]*",
+            ),
+            Container(
+                Button(
+                    label="Deposit",
+                    variant="success",
+                    id="deposit",
+                    classes="large-button",
+                ),
+                Button(
+                    label="Back", variant="error", id="back", classes="large-button"
+                ),
+                classes="horizontal-selection",
+            ),
+            classes="centered-container",
+        )
+
+    def on_screen_resume(self) -> None:
+        # Clear fields on resume
+        clear_fields(self.screen, ["#amount"])
+
+        # Clear errors and success message
+        clear_errors(self.screen, ["#error0", "#error131", "#error133"])
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        self.amount = event.value
+
+    async def on_button_pressed(self, event: Button.Pressed) -> None:
+        # Get button ID and validate it
+        button_id = event.button.id
+        if button_id is None:
+            return
+
+        match button_id:
+            case "back":
+                self.app.pop_screen()
+
+            case "deposit":
+                # Clear errors and success message
+                clear_errors(self.screen, ["#error0", "#error131", "#error133"])
+
+                # Handle incomplete fields error
+                error_code = handle_incomplete_fields_error([self.amount])
+                if error_code == 131:
+                    update_hidden(error_code != 131, self.query_one("#error131"))
+                    return
+
+                # Send deposit and handle error
+                try:
+                    error_code, _ = await self.client.deposit(self.uuid, self.amount)
+                except CONNECTION_ERRORS:
+                    self.app.push_screen(Timeout())
+                    return
+
+                # Clear amount to deny accidental deposit
+                clear_fields(self.screen, ["#amount"])
+
+                # Show success message
+                update_hidden(error_code != 0, self.query_one("#error0"))
+
+
+class BankWithdraw(Screen):
+    def __init__(self, client: AsyncClient, uuid):
+        super().__init__()
+        self.client = client
+        self.TEXT = (
+            "Please enter the amount of money you want to withdraw from your account"
+        )
+        self.ERROR0 = "Succesfully withdrawed the amount from your account balance"
+        self.amount = ""
+        self.uuid = uuid
+
+    def compose(self) -> ComposeResult:
+        yield Header(show_clock=True)
+        yield Footer()
+        yield Container(
+            Static(self.TEXT, classes="text"),
+            Static(ERROR3_TEXT, id="error3", classes="text error hidden"),
+            Static(ERROR131_TEXT, id="error131", classes="text error hidden"),
+            Static(self.ERROR0, id="error0", classes="text success hidden"),
+            Input(
+                placeholder="Amount",
+                id="amount",
+                valid_empty=False,
+                restrict=r"[0-9]*",
+            ),
+            Container(
+                Button(
+                    label="Withdraw",
+                    variant="warning",
+                    id="withdraw",
+                    classes="large-button",
+                ),
+                Button(
+                    label="Back", variant="error", id="back", classes="large-button"
+                ),
+                classes="horizontal-selection",
+            ),
+            classes="centered-container",
+        )
+
+    def on_screen_resume(self) -> None:
+        # Clear fields on resume
+        clear_fields(self.screen, ["#amount"])
+
+        # Clear errors and success message
+        clear_errors(self.screen, ["#error0", "#error3", "#error131"])
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        self.amount = event.value
+
+    async def on_button_pressed(self, event: Button.Pressed) -> None:
+        # Get button ID and validate it
+        button_id = event.button.id
+        if button_id is None:
+            return
+
+        match button_id:
+            case "back":
+                self.app.pop_screen()
+
+            case "withdraw":
+                # Clear errors and success message
+                clear_errors(self.screen, ["#error0", "#error3", "#error131"])
+
+                # Handle incomplete fields error
+                error_code = handle_incomplete_fields_error([self.amount])
+                if error_code == 131:
+                    update_hidden(error_code != 131, self.query_one("#error131"))
+                    return
+
+                # Send withdraw and handle error
+                try:
+                    error_code, _ = await self.client.withdraw(self.uuid, self.amount)
+                except CONNECTION_ERRORS:
+                    self.app.push_screen(Timeout())
+                    return
+                update_hidden(error_code != 3, self.query_one("#error3"))
+
+                # Clear amount to prevent accidental withdraw
+                clear_fields(self.screen, ["#amount"])
+
+                # Show success message
+                update_hidden(error_code != 0, self.query_one("#error0"))
+
+
+class BankTransfer(Screen):
+    def __init__(self, client: AsyncClient, uuid):
+        super().__init__()
+        self.client = client
+        self.TEXT = (
+            "Please enter the recipient's UUID and the amount you want to transfer"
+        )
+        self.ERROR0 = "Transaction succesful"
+        self.uuid = uuid
+        self.recv_uuid = ""
+        self.amount = ""
+
+    def compose(self) -> ComposeResult:
+        yield Header(show_clock=True)
+        yield Footer()
+        yield Container(
+            Static(self.TEXT, classes="text"),
+            Static(self.ERROR0, id="error0", classes="text success hidden"),
+            Static(ERROR3_TEXT, id="error3", classes="text error hidden"),
+            Static(ERROR131_TEXT, id="error131", classes="text error hidden"),
+            Static(ERROR252_TEXT, id="error252", classes="text error hidden"),
+            Input(
+                placeholder="Receiver UUID",
+                id="recv-uuid",
+                valid_empty=False,
+                restrict=r"[a-z0-9-]*",
+            ),
+            Input(
+                placeholder="Amount",
+                id="amount",
+                valid_empty=False,
+                restrict=r"[0-9]*",
+            ),
+            Container(
+                Button(
+                    label="Transfer",
+                    variant="warning",
+                    id="transfer",
+                    classes="large-button",
+                ),
+                Button(
+                    label="Back", variant="error", id="back", classes="large-button"
+                ),
+                classes="horizontal-selection",
+            ),
+            classes="centered-container",
+        )
+
+    def on_screen_resume(self) -> None:
+        # Clear fields on resume
+        clear_fields(self.screen, ["#recv-uuid", "#amount"])
+
+        # Clear errors and success message
+        clear_errors(self.screen, ["#error0", "#error3", "#error131", "#error252"])
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "recv-uuid":
+            self.recv_uuid = event.value
+        elif event.input.id == "amount":
+            self.amount = event.value
+
+    async def on_button_pressed(self, event: Button.Pressed) -> None:
+        # Get button ID and validate it
+        button_id = event.button.id
+        if button_id is None:
+            return
+
+        match button_id:
+            case "back":
+                self.app.pop_screen()
+
+            case "transfer":
+                # Clear errors and success message
+                clear_errors(
+                    self.screen, ["#error0", "#error3", "#error131", "#error252"]
+                )
+
+                # Handle incomplete fields error
+                error_code = handle_incomplete_fields_error(
+                    [self.recv_uuid, self.amount]
+                )
+                if error_code == 131:
+                    update_hidden(error_code != 131, self.query_one("#error131"))
+                    return
+
+                # Send transfer and handles errors
+                try:
+                    error_code, _ = await self.client.transfer(
+                        sender_uuid=self.uuid,
+                        recv_uuid=self.recv_uuid,
+                        amount=self.amount,
+                    )
+                except CONNECTION_ERRORS:
+                    self.app.push_screen(Timeout())
+                    return
+
+                # Clear amount to deny accidental double transfer
+                clear_fields(self.screen, ["#amount"])
+
+                # UUID not found
+                if error_code == 252:
+                    update_hidden(error_code != 252, self.query_one("#error252"))
+                    return
+
+                # Insufficient funds
+                if error_code == 3:
+                    update_hidden(error_code != 3, self.query_one("#error3"))
+                    return
+
+                # Show success message
+                update_hidden(error_code != 0, self.query_one("#error0"))
+
+
+class BankVerifyPassword(Screen):
+    def __init__(self, client: AsyncClient, username: str):
+        super().__init__()
+        self.client = client
+        self.TEXT = "Please enter your current password"
+        self.ERROR1_TEXT = "Password doesn't match actual password"
+        self.username = username
+        self.password = ""
+        self.changed = False
+
+    def compose(self) -> ComposeResult:
+        yield Header(show_clock=True)
+        yield Footer()
+        yield Container(
+            Static(self.TEXT, classes="text"),
+            Static(self.ERROR1_TEXT, id="error1", classes="text error hidden"),
+            Static(ERROR131_TEXT, id="error131", classes="text error hidden"),
+            Input(
+                placeholder="Current password",
+                id="password",
+                valid_empty=False,
+                password=True,
+            ),
+            Container(
+                Button(
+                    label="Check password",
+                    variant="warning",
+                    id="checkpasswd",
+                    classes="large-button",
+                ),
+                Button(
+                    label="Back", variant="error", id="back", classes="large-button"
+                ),
+                classes="horizontal-selection",
+            ),
+            classes="centered-container",
+        )
+
+    def on_screen_resume(self) -> None:
+        if self.changed:
+            # Reused for the next password change of the session
+            self.changed = False
+            self.app.pop_screen()
+
+        # Clear fields on resume
+        clear_fields(self.screen, ["#password"])
+
+        # Clear errors and success message
+        clear_errors(self.screen, ["#error1", "#error131"])
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        self.password = event.value
+
+    async def on_button_pressed(self, event: Button.Pressed) -> None:
+        # Get button ID and validate it
+        button_id = event.button.id
+        if button_id is None:
+            return
+
+        match button_id:
+            case "back":
+                self.app.pop_screen()
+
+            case "checkpasswd":
+                # Clear errors
+                clear_errors(self.screen, ["#error1", "#error131"])
+
+                # Handle incomplete fields error
+                error_code = handle_incomplete_fields_error([self.password])
+                if error_code == 131:
+                    update_hidden(error_code != 131, self.query_one("#error131"))
+                    return
+
+                # Tries to login with supplied information
+                try:
+                    error_code, uuid = await self.client.login(
+                        self.username, self.password
+                    )
+                except CONNECTION_ERRORS:
+                    self.app.push_screen(Timeout())
+                    return
+                if error_code == 1:
+                    update_hidden(error_code != 1, self.query_one("#error1"))
+                    return
+
+                # Show success message
+                self.changed = self.app.push_screen(
+                    BankChangePassword(self.client, uuid, self.password)
+                )
+
+
+class BankChangePassword(Screen):
+    def __init__(self, client: AsyncClient, uuid: str, old_password: str):
+        super().__init__()
+        self.client = client
+        self.TEXT = "Please enter your new password"
+        self.ERROR0_TEXT = "Password changed succesfully"
+        self.uuid = uuid
+        self.old_password = old_password
+        self.password = ""
+        self.confirm_password = ""
+
+    def compose(self) -> ComposeResult:
+        yield Header(show_clock=True)
+        yield Footer()
+        yield Container(
+            Static(self.TEXT, classes="text"),
+            Static(self.ERROR0_TEXT, id="error0", classes="text success hidden"),
+            Static(ERROR131_TEXT, id="error131", classes="text error hidden"),
+            Static(ERROR132_TEXT, id="error132", classes="text error hidden"),
+            Input(
+                placeholder="New password",
+                id="password",
+                valid_empty=False,
+                password=True,
+            ),
+            Input(
+                placeholder="Confirm new password",
+                id="confirm-password",
+                valid_empty=False,
+                password=True,
+            ),
+            Container(
+                Button(
+                    label="Change password",
+                    variant="warning",
+                    id="chpasswd",
+                    classes="large-button",
+                ),
+                Button(
+                    label="Back", variant="error", id="back", classes="large-button"
+                ),
+                classes="horizontal-selection",
+            ),
+            classes="centered-container",
+        )
+
+    def on_screen_resume(self) -> None:
+        # Clear fields on resume
+        clear_fields(self.screen, ["#password", "#confirm-password"])
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        if event.input.id == "password":
+            self.password = event.value
+        elif event.input.id == "confirm-password":
+            self.confirm_password = event.value
+
+    async def on_button_pressed(self, event: Button.Pressed) -> None:
+        # Get button ID and validate it
+        button_id = event.button.id
+        if button_id is None:
+            return
+
+        match button_id:
+            case "back":
+                self.dismiss(True)
+
+            case "chpasswd":
+                # Clear errors and success message
+                clear_errors(self.screen, ["#error0", "#error131", "#error132"])
+                error_code = 0
+                # Handle incomplete fields error
+                error_code = handle_incomplete_fields_error(
+                    [self.password, self.confirm_password]
+                )
+                if error_code == 131:
+                    update_hidden(error_code != 131, self.query_one("#error131"))
+                    return
+
+                # Handle password mismatch
+                if self.password != self.confirm_password:
+                    error_code = 132
+                    update_hidden(error_code != 132, self.query_one("#error132"))
+                    return
+
+                # Sends CHPASSWD with supplied information
+                try:
+                    error_code, _ = await self.client.chpasswd(
+                        self.uuid, self.old_password, self.password
+                    )
+                except CONNECTION_ERRORS:
+                    self.app.push_screen(Timeout())
+                    return
+
+                # Show success message
+                update_hidden(error_code != 0, self.query_one("#error0"))
+
+
+class BankMainMenu(Screen):
+    # Seconds between balance refreshes, stretched while the server is slow
+    REFRESH_INTERVAL = float(getenv("TELEGODS_BALANCE_INTERVAL", "10"))
+    MAX_REFRESH_INTERVAL = 120.0
+    SLOW_REPLY = 1.0
+    # Screens built once per session, their names match the button ids
+    SESSION_SCREENS = ["deposit", "withdraw", "transfer", "chpasswd"]
+
+    def __init__(self, client: AsyncClient, uuid: str, username: str):
+        super().__init__()
+        self.client = client
+        self.uuid = uuid
+        self.username = username
+        # The BALANCE request in flight, shared by every refresh trigger
+        self.refreshing: Worker | None = None
+        # Resumes caused by prepare_screens, which need no refresh
+        self.prewarm_resumes = 0
+        self.TEXT = f"Welcome back {username}, your UUID is {self.uuid}\n\nPlease select a transaction:"
+
+    def compose(self) -> ComposeResult:
+        yield Header(show_clock=True)
+        yield Footer()
+        yield Container(
+            Static(self.TEXT, classes="text"),
+            Static("Balance: ...", id="live-balance", classes="text"),
+            Button(
+                label="Check balance",
+                variant="success",
+                id="balance",
+                classes="large-button",
+            ),
+            Button(
+                label="Deposit funds",
+                variant="success",
+                id="deposit",
+                classes="large-button",
+            ),
+            Button(
+                label="Withdraw money",
+                variant="warning",
+                id="withdraw",
+                classes="large-button",
+            ),
+            Button(
+                label="Transfer funds",
+                variant="warning",
+                id="transfer",
+                classes="large-button",
+            ),
+            Container(
+                Button(
+                    label="Change Password",
+                    variant="error",
+                    id="chpasswd",
+                    classes="large-button",
+                ),
+                Button(
+                    label="Logout",
+                    variant="error",
+                    id="logout",
+                    classes="large-button",
+                ),
+                classes="horizontal-selection",
+            ),
+            classes="centered-container",
+        )
+
+    def on_mount(self) -> None:
+        self.run_worker(self.auto_refresh(), group="balance")
+        # Compose the action screens while the user reads the menu
+        self.set_timer(0.5, self.prepare_screens)
+
+    def session_screen(self, name: str) -> Screen:
+        # Installed screens survive being popped, their on_screen_resume resets them
+        if not self.app.is_screen_installed(f"bank-{name}"):
+            match name:
+                case "deposit":
+                    screen = BankDeposit(self.client, self.uuid)
+                case "withdraw":
+                    screen = BankWithdraw(self.client, self.uuid)
+                case "transfer":
+                    screen = BankTransfer(self.client, self.uuid)
+                case "chpasswd":
+                    screen = BankVerifyPassword(self.client, self.username)
+            self.app.install_screen(screen, f"bank-{name}")
+        return self.app.get_screen(f"bank-{name}")
+
+    async def prepare_screens(self) -> None:
+        for name in self.SESSION_SCREENS:
+            # The user may have moved on while the previous screen was mounting
+            if self.app.screen is not self:
+                return
+            screen = self.session_screen(name)
+            if not screen.is_running:
+                # Pushing mounts the screen. Installed screens stay mounted once
+                # popped, so pushing it later is instant. Nothing runs in between,
+                # so no frame shows it
+                mounted = self.app.push_screen(screen)
+                self.app.pop_screen()
+                # The pop resumes this screen, its balance is still current
+                self.prewarm_resumes += 1
+                await mounted
+
+    def close_screens(self) -> None:
+        for name in self.SESSION_SCREENS:
+            if self.app.is_screen_installed(f"bank-{name}"):
+                screen = self.app.get_screen(f"bank-{name}")
+                self.app.uninstall_screen(screen)
+                screen.remove()
+
+    def on_screen_resume(self) -> None:
+        if self.prewarm_resumes:
+            self.prewarm_resumes -= 1
+            return
+        # Deposits, withdrawals and transfers happen on the screens above
+        self.request_refresh()
+
+    def request_refresh(self) -> Worker:
+        if self.refreshing is None or self.refreshing.is_finished:
+            self.refreshing = self.run_worker(self.fetch_balance(), group="balance")
+        return self.refreshing
+
+    async def fetch_balance(self) -> float | None:
+        # Reply time in seconds, None if the balance couldn't be read
+        start = perf_counter()
+        try:
+            error_code, balance = await self.client.balance(refresh=True)
+        except (OSError, EOFError, ValueError, asyncio.TimeoutError):
+            return None
+        if error_code != 0:
+            return None
+        self.query_one("#live-balance", Static).update(f"Balance: {balance} ＴＣ")
+        return perf_counter() - start
+
+    async def auto_refresh(self) -> None:
+        interval = self.REFRESH_INTERVAL
+        while True:
+            await asyncio.sleep(interval)
+            # Only refresh what the user is looking at
+            if self.app.screen is not self:
+                continue
+            latency = await self.request_refresh().wait()
+            if latency is None or latency > self.SLOW_REPLY:
+                interval = min(interval * 2, self.MAX_REFRESH_INTERVAL)
+            else:
+                interval = self.REFRESH_INTERVAL
+
+    async def logout(self):
+        # Leaving cancels the workers, which must not happen halfway through a reply
+        if self.refreshing is not None:
+            await self.refreshing.wait()
+        _, _ = await self.client.logout()
+        self.app.pop_screen()
+        self.close_screens()
+
+    async def on_button_pressed(self, event: Button.Pressed) -> None:
+        button_id = event.button.id
+        if button_id is None:
+            return
+        match button_id:
+            case "balance":
+                try:
+                    error_code, cmd_return = await self.client.balance()
+                except CONNECTION_ERRORS:
+                    self.app.push_screen(Timeout())
+                    return
+                if error_code != 0:
+                    return
+                self.app.push_screen(BankBalance(cmd_return))
+            case "deposit" | "withdraw" | "transfer" | "chpasswd":
+                self.app.push_screen(self.session_screen(button_id))
+            case "logout":
+                await self.logout()
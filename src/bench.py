@@ -0,0 +1,204 @@
+import random
+from argparse import ArgumentParser, ArgumentTypeError
+from collections import Counter, defaultdict
+from threading import Barrier, Lock, Thread
+from time import perf_counter
+
+from client import ERROR_CODES, Client
+from fake_server import FakeServer
+from metrics import METRICS
+
+COMMANDS = ["login", "balance", "deposit", "withdraw", "transfer", "list_liquors"]
+DEFAULT_MIX = "balance=4,deposit=2,withdraw=2,transfer=1,login=1"
+
+
+class Results:
+    def __init__(self):
+        self.lock = Lock()
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.error_codes: dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, command: str, latency: float, error_code: int | str) -> None:
+        with self.lock:
+            self.latencies[command].append(latency)
+            self.error_codes[command][error_code] += 1
+
+
+class Session(Thread):
+    def __init__(self, args, index: int, results: Results, barrier: Barrier):
+        super().__init__(daemon=True)
+        self.args = args
+        self.results = results
+        self.barrier = barrier
+        self.username = f"{args.username_prefix}{index}"
+        self.random = random.Random(args.seed + index)
+        self.client = Client()
+        self.client.CAPABILITIES = args.capabilities
+        self.uuid = ""
+
+    def run_command(self, command: str) -> tuple[int, str]:
+        amount = str(self.random.randint(1, self.args.max_amount))
+        match command:
+            case "login":
+                return self.client.login(self.username, self.args.password)
+            case "balance":
+                # Measures the server, not the local balance cache
+                return self.client.balance(refresh=True)
+            case "deposit":
+                return self.client.deposit(self.uuid, amount)
+            case "withdraw":
+                return self.client.withdraw(self.uuid, amount)
+            case "transfer":
+                return self.client.transfer(self.uuid, self.uuid, amount)
+            case "list_liquors":
+                return self.client.list_liquors()
+
+    def timed(self, command: str) -> tuple[int, str]:
+        start = perf_counter()
+        try:
+            error_code, data = self.run_command(command)
+        except Exception as exception:
+            self.results.record(
+                command, perf_counter() - start, type(exception).__name__
+            )
+            raise
+        self.results.record(command, perf_counter() - start, error_code)
+        return error_code, data
+
+    def run(self) -> None:
+        # Setup is not part of the measured mix
+        try:
+            error_code, _ = self.client.connect(self.args.ip, self.args.port)
+            if error_code == 0 and self.args.server == "bank":
+                self.client.register(self.username, self.args.password)
+                error_code, self.uuid = self.client.login(
+                    self.username, self.args.password
+                )
+        except Exception:
+            error_code = 130
+        finally:
+            self.barrier.wait()
+        if error_code != 0:
+            with self.results.lock:
+                self.results.error_codes["setup"][error_code] += 1
+            return
+
+        commands, weights = zip(*self.args.mix.items())
+        for command in self.random.choices(commands, weights, k=self.args.requests):
+            try:
+                self.timed(command)
+            except Exception:
+                # The client may have restored the session already, heartbeat
+                # only reconnects and logs in again when it didn't
+                if self.client.heartbeat() != 0:
+                    return
+        self.client.disconnect()
+
+
+def percentile(values: list[float], percent: float) -> float:
+    # Nearest rank, values must be sorted
+    index = max(int(round(percent / 100 * len(values))) - 1, 0)
+    return values[index]
+
+
+def describe(error_code: int | str) -> str:
+    if isinstance(error_code, str):
+        return error_code
+    return f"{error_code} ({ERROR_CODES.get(error_code, 'Unknown')})"
+
+
+def parse_mix(mix: str) -> dict[str, int]:
+    weights = {}
+    for entry in mix.split(","):
+        command, _, weight = entry.partition("=")
+        command = command.strip()
+        if command not in COMMANDS:
+            raise ArgumentTypeError(f"unknown command {command!r}")
+        weights[command] = int(weight or 1)
+    return weights
+
+
+def report(results: Results, elapsed: float) -> None:
+    total = sum(len(latencies) for latencies in results.latencies.values())
+    print(f"{total} requests in {elapsed:.2f} s, {total / elapsed:.1f} req/s\n")
+    print(f"{'command':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for command, latencies in sorted(results.latencies.items()):
+        latencies.sort()
+        p50, p95, p99 = (percentile(latencies, p) * 1000 for p in (50, 95, 99))
+        print(f"{command:<14}{len(latencies):>8}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}")
+    print("\nerror codes")
+    for command, error_codes in sorted(results.error_codes.items()):
+        for error_code, count in error_codes.most_common():
+            print(f"  {command:<14}{describe(error_code):<40}{count:>8}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = ArgumentParser(
+        prog="telegods-bench",
+        description="Drives concurrent client sessions against a TeleGods server",
+    )
+    parser.add_argument("--ip", default="127.0.0.1")
+    parser.add_argument("--port", default="8888")
+    parser.add_argument("--server", choices=["bank", "liquor_store"], default="bank")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="per session")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--username-prefix", default="bench_")
+    parser.add_argument("--password", default="bench")
+    parser.add_argument("--max-amount", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--text", action="store_true", help="never negotiate the binary protocol"
+    )
+    parser.add_argument(
+        "--compression", action="store_true", help="offer zlib compression"
+    )
+    parser.add_argument(
+        "--idempotency",
+        action="store_true",
+        help="key and journal money moving commands",
+    )
+    parser.add_argument(
+        "--metrics-out", help="client metrics dump, .prom for Prometheus text"
+    )
+    fake = parser.add_argument_group("in-process fake server")
+    fake.add_argument("--fake", action="store_true", help="ignores --ip/--port")
+    fake.add_argument("--latency", type=float, default=0.0, help="seconds")
+    fake.add_argument("--fragment-size", type=int, default=0, help="bytes")
+    fake.add_argument("--catalog-size", type=int, default=20)
+    args = parser.parse_args(argv)
+    args.capabilities = [
+        name
+        for name, offered in (
+            ("binary", not args.text),
+            ("idempotency", args.idempotency),
+            ("zlib", args.compression),
+        )
+        if offered
+    ]
+
+    if args.fake:
+        server = FakeServer(
+            args.server, args.latency, args.fragment_size, args.catalog_size
+        )
+        args.ip = "127.0.0.1"
+        args.port = str(server.start_in_thread(args.ip))
+
+    results = Results()
+    # Sessions start issuing commands together, after all of them logged in
+    barrier = Barrier(args.sessions + 1)
+    sessions = [Session(args, i, results, barrier) for i in range(args.sessions)]
+    for session in sessions:
+        session.start()
+    barrier.wait()
+    start = perf_counter()
+    for session in sessions:
+        session.join()
+    elapsed = perf_counter() - start
+    report(results, elapsed)
+    if args.metrics_out:
+        METRICS.dump(args.metrics_out)
+
+
+if __name__ == "__main__":
+    main()
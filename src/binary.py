@@ -0,0 +1,145 @@
+import struct
+import sys
+import zlib
+from array import array
+
+from framing import COMPRESSION_LEVEL
+
+# Every frame is a little endian length followed by that many bytes. Requests
+# start with an opcode and replies with a status, 0 for OK or an error code,
+# then come the fields, each one tagged with its type
+FRAME = struct.Struct("<I")
+OPCODE = struct.Struct("<B")
+STATUS = struct.Struct("<H")
+INT64 = struct.Struct("<q")
+FLOAT64 = struct.Struct("<d")
+LENGTH = struct.Struct("<H")
+COUNT = struct.Struct("<I")
+# Set in the frame length when the payload is a zlib stream
+COMPRESSED = 1 << 31
+
+# Reply status of a conditional LIST while the catalog is unchanged
+NOT_MODIFIED = 304
+
+OPCODES = {
+    "LOGIN": 1,
+    "REGISTER": 2,
+    "LOGOUT": 3,
+    "BALANCE": 4,
+    "DEPOSIT": 5,
+    "WITH": 6,
+    "TRANSFER": 7,
+    "CHPASSWD": 8,
+    "LIST": 9,
+    "PING": 10,
+}
+COMMANDS = {opcode: command for command, opcode in OPCODES.items()}
+
+# Field tags
+INTEGER = ord("q")
+FLOAT = ord("d")
+STRING = ord("s")
+INTEGERS = ord("i")
+FLOATS = ord("f")
+STRINGS = ord("t")
+STRINGS_SEPARATOR = "\0"
+
+
+def encode_fields(fields) -> bytes:
+    parts = []
+    for field in fields:
+        if isinstance(field, int):
+            parts += [bytes([INTEGER]), INT64.pack(field)]
+        elif isinstance(field, float):
+            parts += [bytes([FLOAT]), FLOAT64.pack(field)]
+        elif isinstance(field, str):
+            data = field.encode("utf-8")
+            parts += [bytes([STRING]), LENGTH.pack(len(data)), data]
+        elif isinstance(field, array):
+            tag = INTEGERS if field.typecode == "i" else FLOATS
+            if sys.byteorder == "big":
+                field = array(field.typecode, field)
+                field.byteswap()
+            parts += [bytes([tag]), COUNT.pack(len(field)), field.tobytes()]
+        else:
+            data = STRINGS_SEPARATOR.join(field).encode("utf-8")
+            parts += [bytes([STRINGS]), COUNT.pack(len(data)), data]
+    return b"".join(parts)
+
+
+def decode_fields(payload: memoryview) -> list:
+    # Reads straight from the received buffer, only the field values are built
+    fields = []
+    offset = 0
+    while offset < len(payload):
+        tag = payload[offset]
+        offset += 1
+        if tag == INTEGER:
+            fields.append(INT64.unpack_from(payload, offset)[0])
+            offset += INT64.size
+        elif tag == FLOAT:
+            fields.append(FLOAT64.unpack_from(payload, offset)[0])
+            offset += FLOAT64.size
+        elif tag == STRING:
+            (size,) = LENGTH.unpack_from(payload, offset)
+            offset += LENGTH.size
+            fields.append(str(payload[offset : offset + size], "utf-8"))
+            offset += size
+        elif tag in (INTEGERS, FLOATS):
+            (count,) = COUNT.unpack_from(payload, offset)
+            offset += COUNT.size
+            values = array("i" if tag == INTEGERS else "d")
+            end = offset + count * values.itemsize
+            values.frombytes(payload[offset:end])
+            if sys.byteorder == "big":
+                values.byteswap()
+            fields.append(values)
+            offset = end
+        elif tag == STRINGS:
+            (size,) = COUNT.unpack_from(payload, offset)
+            offset += COUNT.size
+            text = str(payload[offset : offset + size], "utf-8")
+            fields.append(text.split(STRINGS_SEPARATOR) if size else [])
+            offset += size
+        else:
+            raise ValueError(f"Unknown field type {tag}")
+    return fields
+
+
+def encode_request(command: str, fields) -> bytes:
+    payload = OPCODE.pack(OPCODES[command]) + encode_fields(fields)
+    return FRAME.pack(len(payload)) + payload
+
+
+def decode_request(payload: bytes) -> tuple[str, list]:
+    view = memoryview(payload)
+    return COMMANDS[view[0]], decode_fields(view[OPCODE.size :])
+
+
+def encode_reply(status: int, fields) -> bytes:
+    payload = STATUS.pack(status) + encode_fields(fields)
+    return FRAME.pack(len(payload)) + payload
+
+
+def compress_frame(frame: bytes) -> bytes:
+    payload = zlib.compress(memoryview(frame)[FRAME.size :], COMPRESSION_LEVEL)
+    return FRAME.pack(len(payload) | COMPRESSED) + payload
+
+
+def decode_reply(payload: bytes) -> list:
+    # Same shape as a split text reply, so one parser serves both protocols
+    view = memoryview(payload)
+    (status,) = STATUS.unpack_from(view)
+    if status == 0:
+        return ["OK", *decode_fields(view[STATUS.size :])]
+    if status == NOT_MODIFIED:
+        return ["NOTMODIFIED", *decode_fields(view[STATUS.size :])]
+    return ["ERROR", status]
+
+
+def catalog_items(fields: list) -> tuple[list, str]:
+    # Rows and trailing metadata as in the JSON catalog, plus the catalog version
+    uuids, names, origins, stock, price, connected_users, owner_uuid, *version = fields
+    items = [list(row) for row in zip(uuids, names, origins, stock, price)]
+    items += [connected_users, owner_uuid]
+    return items, version[0] if version else ""
@@ -0,0 +1,221 @@
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+
+TOKEN_SEPARATOR = re.compile(r"[\W_]+")
+
+
+class SearchIndex:
+    # Trigram postings for substring queries, sorted tokens for short prefixes
+    __slots__ = ("trigrams", "texts", "tokens", "tokens_sorted", "previous")
+
+    def __init__(self):
+        self.trigrams: dict[str, array] = {}
+        self.texts: list[str] = []
+        self.tokens: list[tuple[str, int]] = []
+        self.tokens_sorted = True
+        # Last query and its matches, narrowed while the user keeps typing
+        self.previous: tuple[str, list[int]] | None = None
+
+    def add(self, number: int, *fields: str) -> None:
+        text = " ".join(fields).casefold()
+        self.texts.append(text)
+        for trigram in {text[i : i + 3] for i in range(len(text) - 2)}:
+            postings = self.trigrams.get(trigram)
+            if postings is None:
+                postings = self.trigrams[trigram] = array("i")
+            postings.append(number)
+        self.tokens.extend(
+            (token, number) for token in TOKEN_SEPARATOR.split(text) if token
+        )
+        self.tokens_sorted = False
+        self.previous = None
+
+    def sort_tokens(self) -> None:
+        if not self.tokens_sorted:
+            self.tokens.sort()
+            self.tokens_sorted = True
+
+    def search(self, query: str) -> list[int] | None:
+        # Matching row numbers in catalog order, None for an empty query
+        query = query.strip().casefold()
+        if not query:
+            return None
+
+        if len(query) < 3:
+            self.sort_tokens()
+            matches = set()
+            for token, number in self.tokens[bisect_left(self.tokens, (query,)) :]:
+                if not token.startswith(query):
+                    break
+                matches.add(number)
+            return sorted(matches)
+
+        if self.previous is not None and query.startswith(self.previous[0]):
+            candidates = self.previous[1]
+        else:
+            # The rarest trigram of the query bounds the rows worth checking
+            postings = [
+                self.trigrams.get(query[i : i + 3], ()) for i in range(len(query) - 2)
+            ]
+            candidates = min(postings, key=len)
+        matches = [number for number in candidates if query in self.texts[number]]
+        self.previous = (query, matches)
+        return matches
+
+
+class Catalog:
+    # Column arrays indexed by row number, rows are never stored as objects
+    __slots__ = (
+        "uuids",
+        "names",
+        "origins",
+        "stock",
+        "price",
+        "index",
+        "sorted",
+        "ranks",
+        "sorted_values",
+        "search_index",
+    )
+
+    def __init__(self, rows: list[list] | None = None):
+        self.uuids: list[str] = []
+        self.names: list[str] = []
+        self.origins: list[str] = []
+        self.stock = array("i")
+        self.price = array("d")
+        # uuid -> row number
+        self.index: dict[str, int] = {}
+        # Presorted row numbers per sort key, built on first use
+        self.sorted: dict[str, array] = {}
+        self.ranks: dict[str, array] = {}
+        self.sorted_values: dict[str, array] = {}
+        self.search_index = SearchIndex()
+        if rows:
+            self.extend(rows)
+
+    def __len__(self) -> int:
+        return len(self.uuids)
+
+    def extend(self, rows: list[list]) -> None:
+        if rows:
+            uuids, names, origins, stock, price = zip(*rows)
+            self.extend_columns(
+                uuids,
+                names,
+                origins,
+                array("i", map(int, stock)),
+                array("d", map(float, price)),
+            )
+
+    def extend_columns(
+        self,
+        uuids: Sequence[str],
+        names: Sequence[str],
+        origins: Sequence[str],
+        stock: array,
+        price: array,
+    ) -> None:
+        start = len(self)
+        for number, (commercial_name, cc) in enumerate(zip(names, origins), start):
+            self.search_index.add(number, commercial_name, cc)
+        self.index.update(zip(uuids, range(start, start + len(uuids))))
+        self.uuids.extend(uuids)
+        self.names.extend(names)
+        self.origins.extend(origins)
+        self.stock.extend(stock)
+        self.price.extend(price)
+        # Indexes are rebuilt lazily, so streaming many batches stays linear
+        self.sorted.clear()
+        self.ranks.clear()
+        self.sorted_values.clear()
+
+    def row(self, number: int) -> list:
+        return [
+            self.uuids[number],
+            self.names[number],
+            self.origins[number],
+            self.stock[number],
+            self.price[number],
+        ]
+
+    def get(self, uuid: str) -> list | None:
+        number = self.index.get(uuid)
+        return None if number is None else self.row(number)
+
+    def sorted_by(self, key: str) -> array:
+        if key not in self.sorted:
+            if key == "name":
+                folded = [name.casefold() for name in self.names]
+                order = sorted(range(len(self)), key=folded.__getitem__)
+            else:
+                column = self.price if key == "price" else self.stock
+                order = sorted(range(len(self)), key=column.__getitem__)
+                values = array(column.typecode, (column[n] for n in order))
+                self.sorted_values[key] = values
+            self.sorted[key] = array("i", order)
+        return self.sorted[key]
+
+    def rank(self, key: str) -> array:
+        # Position of every row inside the presorted index
+        if key not in self.ranks:
+            ranks = array("i", [0]) * len(self)
+            for position, number in enumerate(self.sorted_by(key)):
+                ranks[number] = position
+            self.ranks[key] = ranks
+        return self.ranks[key]
+
+    def range(
+        self, key: str, low: float | None = None, high: float | None = None
+    ) -> Sequence[int]:
+        # Rows with low <= value <= high, in key order, without copying the index
+        order = self.sorted_by(key)
+        values = self.sorted_values[key]
+        start = 0 if low is None else bisect_left(values, low)
+        end = len(values) if high is None else bisect_right(values, high)
+        return memoryview(order)[start:end]
+
+    def search(self, query: str) -> list[int] | None:
+        return self.search_index.search(query)
+
+    def under(self, price: float) -> Sequence[int]:
+        return self.range("price", high=price)
+
+    def in_stock(self) -> Sequence[int]:
+        return self.range("stock", low=1)
+
+    def view(
+        self,
+        sort: str | None = None,
+        max_price: float | None = None,
+        in_stock: bool = False,
+        matches: Sequence[int] | None = None,
+    ) -> Sequence[int]:
+        # Search matches are in catalog order, which is the unsorted order
+        filters = [] if matches is None else [(None, matches)]
+        if max_price is not None:
+            filters.append(("price", self.under(max_price)))
+        if in_stock:
+            filters.append(("stock", self.in_stock()))
+
+        if not filters:
+            return self.sorted_by(sort) if sort else range(len(self))
+
+        # Scan the smallest filtered range and check the other conditions per row
+        key, rows = min(filters, key=lambda entry: len(entry[1]))
+        if len(filters) > 1:
+            allowed = None if matches is None or key is None else set(matches)
+            rows = [
+                n
+                for n in rows
+                if (max_price is None or self.price[n] <= max_price)
+                and (not in_stock or self.stock[n] > 0)
+                and (allowed is None or n in allowed)
+            ]
+        if sort == key:
+            return rows
+        if sort is None:
+            return sorted(rows)
+        return sorted(rows, key=self.rank(sort).__getitem__)
@@ -0,0 +1,105 @@
+import mmap
+import os
+import struct
+from array import array
+from time import time
+
+from catalog import Catalog
+
+MAGIC = b"TGCC"
+FORMAT_VERSION = 2
+# Magic, format version, rows, catalog version size, string block size. The
+# catalog version follows the header
+HEADER = struct.Struct("<4sHIIQ")
+SEPARATOR = "\0"
+
+
+class CatalogCache:
+    # One file per server: a fixed header, the catalog version, the stock and
+    # price columns as raw arrays, then every string column in a single NUL
+    # separated block. The connected users aren't kept, the catalog version
+    # doesn't cover them
+    def __init__(self, ip: str, port: str, ttl: float = 60.0):
+        directory = os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        name = f"catalog-{ip.replace(':', '_')}-{port}.bin"
+        self.path = os.path.join(directory, "telegods", name)
+        # Younger caches are used without asking the server
+        self.ttl = ttl
+        self.version = ""
+        self.owner_uuid = ""
+
+    def is_fresh(self) -> bool:
+        try:
+            return time() - os.path.getmtime(self.path) < self.ttl
+        except OSError:
+            return False
+
+    def load(self) -> Catalog | None:
+        try:
+            with open(self.path, "rb") as file, mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as data:
+                magic, format_version, rows, version_size, size = HEADER.unpack_from(
+                    data
+                )
+                if magic != MAGIC or format_version != FORMAT_VERSION:
+                    return None
+                offset = HEADER.size
+                version = data[offset : offset + version_size].decode("utf-8")
+                offset += version_size
+                stock = array("i")
+                stock.frombytes(data[offset : offset + rows * stock.itemsize])
+                offset += rows * stock.itemsize
+                price = array("d")
+                price.frombytes(data[offset : offset + rows * price.itemsize])
+                offset += rows * price.itemsize
+                strings = data[offset : offset + size].decode("utf-8")
+        except (OSError, ValueError, struct.error, UnicodeDecodeError):
+            return None
+
+        owner_uuid, *columns = strings.split(SEPARATOR)
+        if len(stock) != rows or len(price) != rows or len(columns) != 3 * rows:
+            return None
+        catalog = Catalog()
+        catalog.extend_columns(
+            columns[:rows], columns[rows : 2 * rows], columns[2 * rows :], stock, price
+        )
+        self.version = version
+        self.owner_uuid = owner_uuid
+        return catalog
+
+    def save(self, catalog: Catalog, version: str, owner_uuid: str) -> None:
+        strings = SEPARATOR.join(
+            [owner_uuid, *catalog.uuids, *catalog.names, *catalog.origins]
+        ).encode("utf-8")
+        encoded_version = version.encode("utf-8")
+        header = HEADER.pack(
+            MAGIC, FORMAT_VERSION, len(catalog), len(encoded_version), len(strings)
+        )
+        # Readers never see a half written file
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temporary, "wb") as file:
+                file.write(header)
+                file.write(encoded_version)
+                file.write(catalog.stock.tobytes())
+                file.write(catalog.price.tobytes())
+                file.write(strings)
+            os.replace(temporary, self.path)
+        except OSError:
+            # The cache is only an optimization
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            return
+        self.version = version
+        self.owner_uuid = owner_uuid
+
+    def touch(self) -> None:
+        # The server confirmed the cached version, so it is fresh again
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
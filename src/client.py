@@ -1,111 +1,1062 @@
+import asyncio
 import ipaddress
-from socket import socket, AF_INET, SOCK_STREAM
+import random
+import re
+import socket as sockets
+import zlib
+from concurrent.futures import Future
+from contextlib import aclosing
+from os import getenv
+from functools import partial
+from json import loads
+from socket import (
+    socket,
+    IPPROTO_TCP,
+    MSG_PEEK,
+    SO_KEEPALIVE,
+    SOCK_STREAM,
+    SOL_SOCKET,
+)
+from time import monotonic, perf_counter, sleep
 
+from binary import COMPRESSED, FRAME, catalog_items, decode_reply, encode_request
+from framing import COMPRESSED as COMPRESSED_LINE
+from framing import DELIMITER, JsonArrayParser, LineReader
+from journal import Journal
+from metrics import METRICS, Metrics
+from resolver import RESOLVER, Address, happy_eyeballs
 
-class Client:
-    def validate_ip(self, ip: str) -> tuple[int, str]:
+# Same table as the README
+ERROR_CODES = {
+    0: "No error",
+    1: "Invalid login",
+    2: "Invalid registration",
+    3: "Insufficient funds",
+    128: "Invalid IP or hostname",
+    129: "Invalid port",
+    130: "Couldn't connect to server",
+    131: "Incomplete fields",
+    132: "Passwords don't match",
+    133: "Invalid amount",
+    251: "Unauthorized access",
+    252: "UUID not found",
+    253: "Bad arguments",
+    254: "Unknown command",
+    255: "Unknown error",
+}
+
+# One part of a hostname, no leading or trailing hyphen
+HOSTNAME_LABEL = re.compile(r"(?!-)[A-Za-z0-9-]{1,63}(?<!-)")
+
+# What a dropped, refused or stalled connection raises
+CONNECTION_ERRORS = (OSError, EOFError, asyncio.TimeoutError)
+# Safe to send again when the first reply was lost
+IDEMPOTENT_COMMANDS = {"BALANCE", "LIST"}
+# Carry an idempotency key once the server deduplicates them
+JOURNALED_COMMANDS = {"DEPOSIT", "WITH", "TRANSFER"}
+
+
+class BaseClient:
+    TIMEOUT = 3
+    # Upper bound for a single reply, large enough for big catalogs
+    MAX_LINE = 16 * 1024 * 1024
+    # Seconds a balance read from the server is served locally, other sessions
+    # can move money into the account meanwhile
+    BALANCE_TTL = 5.0
+    metrics: Metrics = METRICS
+    # Last known balance and when the server reported it
+    balance_cache: tuple[int, float] | None = None
+    # Offered in the HI handshake, the server replies with the ones it accepts.
+    # Compression only pays off on slow links, so it is opt-in
+    CAPABILITIES = ["binary", "idempotency", "ping"] + (
+        ["zlib"] if getenv("TELEGODS_COMPRESSION") else []
+    )
+    capabilities: list[str] = []
+    # Length prefixed frames instead of text lines, once the server agrees
+    binary = False
+    # Long replies may arrive compressed
+    compression = False
+    # Money moving commands end with a key the server remembers, so a retry
+    # after a lost reply is never applied twice
+    idempotency = False
+    journal: Journal | None = None
+    # PING is only sent to servers that accept it, others get TCP keepalives alone
+    ping = False
+    # Idle seconds before the first TCP keepalive probe, seconds between probes
+    # and unanswered probes before the kernel drops the connection
+    KEEPALIVE = {"TCP_KEEPIDLE": 30, "TCP_KEEPINTVL": 10, "TCP_KEEPCNT": 3}
+    # Reconnects after a dropped connection wait a random time up to a limit that
+    # doubles on every attempt, so clients of a restarted server spread out
+    RECONNECT_ATTEMPTS = 5
+    BACKOFF_BASE = 0.1
+    BACKOFF_MAX = 5.0
+    # Username and password of the session, to log in again after a reconnect
+    credentials: tuple[str, str] | None = None
+    # Servers sharing the same accounts, a reconnect may land on any of them
+    replicas: list[tuple[str, str]] = []
+
+    @staticmethod
+    def validate_ip(ip: str) -> tuple[int, str]:
         try:
             ipaddress.ip_address(ip)
             return 0, ""
         except ValueError:
             return 128, ""
 
-    def validate_port(self, port: str) -> tuple[int, str]:
+    @staticmethod
+    def validate_host(host: str) -> tuple[int, str]:
+        # An IP address, or a name whose syntax is valid, it is resolved on connect
+        if BaseClient.validate_ip(host)[0] == 0:
+            return 0, ""
+        labels = host.removesuffix(".").split(".")
+        valid = (
+            len(host) <= 253
+            and all(HOSTNAME_LABEL.fullmatch(label) for label in labels)
+            # All numeric names are malformed IPv4 addresses
+            and not labels[-1].isdigit()
+        )
+        return (0, "") if valid else (128, "")
+
+    @staticmethod
+    def validate_port(port: str) -> tuple[int, str]:
         try:
             _port = int(port)
             return (0, "") if 1 <= _port <= 65535 else (129, "")
         except ValueError:
             return 129, ""
 
+    @staticmethod
+    def parse_replicas(addresses: str, default_port: str) -> list[tuple[str, str]]:
+        # Comma separated "host", "host:port" or "[ipv6]:port" entries
+        replicas = []
+        for address in addresses.split(","):
+            address = address.strip()
+            if address.startswith("[") and "]" in address:
+                ip, _, port = address[1:].partition("]")
+                port = port.removeprefix(":")
+            elif address.count(":") == 1:
+                ip, port = address.split(":")
+            else:
+                ip, port = address, ""
+            if ip:
+                replicas.append((ip, port or default_port))
+        return replicas
+
+    def _record(
+        self,
+        command: str,
+        start: float,
+        sent: int,
+        received: int,
+        outcome: str = "ok",
+    ) -> None:
+        name = command.split(maxsplit=1)[0]
+        self.metrics.record(name, perf_counter() - start, sent, received, outcome)
+
+    def _encode(self, command: str, args: tuple) -> bytes:
+        if self.binary:
+            return encode_request(command, args)
+        return " ".join([command, *map(str, args)]).encode("utf-8") + DELIMITER
+
+    def _decode(self, reply: bytes, maxsplit: int) -> list:
+        if self.binary:
+            return decode_reply(reply)
+        return reply.decode("utf-8").split(maxsplit=maxsplit)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2**attempt))
+
+    def _set_keepalive(self, sock: socket) -> None:
+        sock.setsockopt(SOL_SOCKET, SO_KEEPALIVE, 1)
+        for name, value in self.KEEPALIVE.items():
+            # Not every platform can tune all of them
+            if hasattr(sockets, name):
+                sock.setsockopt(IPPROTO_TCP, getattr(sockets, name), value)
+
+    def _journal_key(self, command: str, args: tuple) -> str | None:
+        # Kept in the journal until the server answers
+        if command in JOURNALED_COMMANDS and self.idempotency:
+            return self.journal.add(command, args)
+        return None
+
+    def _acknowledge(self, parse, key: str, reply: list):
+        # Any reply means the server decided, applied or not
+        self.journal.remove(key)
+        return parse(reply)
+
+    def _cached_balance(self) -> str | None:
+        if self.balance_cache is None:
+            return None
+        balance, updated = self.balance_cache
+        if monotonic() - updated > self.BALANCE_TTL:
+            return None
+        return str(balance)
+
+    def _adjust_balance(self, amount: str, sign: int) -> None:
+        # Applies a confirmed transaction, keeping the time of the server read
+        if self.balance_cache is None:
+            return
+        try:
+            delta = int(amount) * sign
+        except ValueError:
+            self.balance_cache = None
+            return
+        balance, updated = self.balance_cache
+        self.balance_cache = (balance + delta, updated)
+
+    # Reply parsers, shared by the blocking and the asyncio clients
+    def _parse_hi(self, reply: list[str]) -> tuple[int, str]:
+        response, *data = reply
+        if response == "OK":
+            self.server, *self.capabilities = data
+            self.binary = "binary" in self.capabilities
+            self.compression = "zlib" in self.capabilities
+            self.idempotency = "idempotency" in self.capabilities
+            self.ping = "ping" in self.capabilities
+            return 0, self.server
+        return 130, ""
+
+    def _parse_login(
+        self, reply: list[str], credentials: tuple[str, str]
+    ) -> tuple[int, str]:
+        response, data = reply
+        if response.startswith("OK"):
+            self.uuid = data
+            self.credentials = credentials
+            self.balance_cache = None
+            return 0, self.uuid
+        return int(data), ""
+
+    def _parse_status(self, reply: list[str]) -> tuple[int, str]:
+        response, *data = reply
+        if response.startswith("OK"):
+            return 0, ""
+        return int(data[0]), ""
+
+    def _parse_balance(self, reply: list[str]) -> tuple[int, str]:
+        response, data = reply
+        if response != "OK":
+            self.balance_cache = None
+            return int(data), ""
+        try:
+            self.balance_cache = (int(data), monotonic())
+        except ValueError:
+            self.balance_cache = None
+        return 0, str(data)
+
+    def _parse_logout(self, _: list[str]) -> tuple[int, str]:
+        self.uuid = ""
+        self.credentials = None
+        self.balance_cache = None
+        # Always succeeds
+        return 0, ""
+
+    def _parse_password_change(
+        self, reply: list[str], new_password: str
+    ) -> tuple[int, str]:
+        error_code, data = self._parse_status(reply)
+        if error_code == 0 and self.credentials is not None:
+            self.credentials = (self.credentials[0], new_password)
+        return error_code, data
+
+    def _parse_transaction(
+        self, reply: list[str], amount: str, sign: int
+    ) -> tuple[int, str]:
+        # Deposits add the amount to the cached balance, withdrawals subtract it
+        error_code, data = self._parse_status(reply)
+        if error_code == 0:
+            self._adjust_balance(amount, sign)
+        else:
+            # The server disagrees with what we know, so ask it next time
+            self.balance_cache = None
+        return error_code, data
+
+    def _transfer_amount(self, sender_uuid: str, recv_uuid: str, amount: str) -> str:
+        # Transfers to the same account leave the balance as it was
+        return "0" if sender_uuid == recv_uuid else amount
+
+    def _parse_list(self, reply: list) -> tuple[int, list]:
+        # Decoded items in both protocols, the binary one has no JSON to decode
+        response, *data = reply
+        if response.startswith("OK"):
+            return 0, catalog_items(data)[0] if self.binary else loads(data[0])
+        return int(data[0]), []
+
+    def _parse_catalog(self, reply: list) -> tuple[int, list]:
+        # Binary replies to a conditional LIST
+        response, *data = reply
+        if response == "NOTMODIFIED":
+            self.catalog_version, self.catalog_modified = data[0], False
+            return 0, []
+        if response != "OK":
+            return int(data[0]), []
+        items, self.catalog_version = catalog_items(data)
+        self.catalog_modified = True
+        return 0, items
+
+
+class Pipeline:
+    def __init__(self, client: "Client"):
+        self.client = client
+        self.commands = []
+        # Journal keys of the queued commands
+        self.keys = []
+
+    def __enter__(self) -> "Pipeline":
+        self.client._pipeline = self
+        return self
+
+    def __exit__(self, exc_type, *_) -> None:
+        self.client._pipeline = None
+        if exc_type is None:
+            self.execute()
+        else:
+            self.discard()
+
+    def queue(
+        self, command: str, request: bytes, parse, maxsplit: int, key: str | None
+    ) -> Future:
+        future = Future()
+        self.commands.append((command, request, parse, maxsplit, future))
+        if key is not None:
+            self.keys.append(key)
+        return future
+
+    def discard(self) -> None:
+        # Never sent, so they must not be replayed at the next login either
+        for key in self.keys:
+            self.client.journal.remove(key)
+        self.commands, self.keys = [], []
+
+    def execute(self) -> None:
+        if not self.commands:
+            return
+
+        # Every queued command goes out in a single write
+        payload = b"".join(request for _, request, *_ in self.commands)
+        start = perf_counter()
+        try:
+            self.client.socket.sendall(payload)
+        except OSError:
+            self.discard()
+            # Part of the payload may be out, the next call reconnects
+            self.client.socket.close()
+            raise
+        commands, self.commands, self.keys = self.commands, [], []
+        self.client.metrics.begin(len(commands))
+
+        # Replies arrive in the same order the commands were sent
+        for index, (command, request, parse, maxsplit, future) in enumerate(commands):
+            try:
+                reply, received = self.client._read_reply()
+            except Exception as exception:
+                outcome = "timeout" if isinstance(exception, TimeoutError) else "error"
+                # The stream is unusable, so no later reply can be matched. Closing
+                # it makes the next call reconnect instead of reading them
+                self.client.socket.close()
+                for pending_command, pending_request, *_, pending in commands[index:]:
+                    sent = len(pending_request)
+                    self.client._record(pending_command, start, sent, 0, outcome)
+                    pending.set_exception(exception)
+                return
+            self.client._record(command, start, len(request), received)
+            try:
+                future.set_result(parse(self.client._decode(reply, maxsplit)))
+            except Exception as exception:
+                future.set_exception(exception)
+
+
+class Client(BaseClient):
+    _pipeline: Pipeline | None = None
+
     def connect(self, ip: str, port: str) -> tuple[int, str]:
         self.ip = ip
         self.port = port
-        self.socket = socket(AF_INET, SOCK_STREAM)
-        self.socket.settimeout(3)
-        try:
-            self.socket.connect((self.ip, int(self.port)))
-            self.socket.sendall("HI\r\n".encode("utf-8"))
-            response, *data = self.socket.recv(1024).decode("utf-8").split()
-            if response == "OK":
-                return 0, data[0]
+        self.journal = Journal(*(self.replicas or [(ip, port)])[0])
+        self.binary = self.compression = self.idempotency = self.ping = False
+        try:
+            self.socket = self._open_socket(RESOLVER.resolve(ip, port))
+        except OSError:
+            RESOLVER.forget(ip, port)
             return 130, ""
-        except ConnectionRefusedError or TimeoutError:
+        self._set_keepalive(self.socket)
+        try:
+            self.reader = LineReader(self.socket)
+            error_code, data = self._call("HI", self._parse_hi, *self.CAPABILITIES)
+            if error_code != 0 and self.CAPABILITIES:
+                # Older servers refuse a HI with arguments
+                error_code, data = self._call("HI", self._parse_hi)
+            return error_code, data
+        except (OSError, EOFError):
+            # A late reply to the handshake would answer the next request
+            self.socket.close()
             return 130, ""
 
+    def _open_socket(self, addresses: list[Address]) -> socket:
+        # Blocking connects can't race, so the interleaved addresses are tried
+        # one after another
+        error = None
+        for family, address in addresses:
+            sock = socket(family, SOCK_STREAM)
+            sock.settimeout(self.TIMEOUT)
+            try:
+                sock.connect(address)
+                return sock
+            except OSError as exception:
+                sock.close()
+                error = exception
+        raise error or OSError("No address to connect to")
+
+    def is_alive(self) -> bool:
+        # A closed connection reads as end of file without blocking
+        try:
+            self.socket.setblocking(False)
+            return self.socket.recv(1, MSG_PEEK) != b""
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        finally:
+            self.socket.settimeout(self.TIMEOUT)
+
+    def heartbeat(self) -> int:
+        # Called between user actions, so a dead connection is replaced before
+        # the next one needs it. 0 once the connection is usable
+        try:
+            if not self.is_alive():
+                raise ConnectionResetError("Connection closed by server")
+            if self.ping and self._pipeline is None:
+                self._request("PING", self._parse_status, (), -1)
+            return 0
+        except (*CONNECTION_ERRORS, ValueError):
+            return self._restore()
+
     def disconnect(self) -> tuple[int, str]:
         self.socket.close()
         return 0, ""
 
+    def connect_replicas(self, replicas: list[tuple[str, str]]) -> tuple[int, str]:
+        # Blocking connects can't race, so replicas are tried in the given order
+        self.replicas = replicas
+        return self._connect_first(replicas)
+
+    def _connect_first(self, replicas: list[tuple[str, str]]) -> tuple[int, str]:
+        for ip, port in replicas:
+            error_code, data = self.connect(ip, port)
+            if error_code == 0:
+                return error_code, data
+        return 130, ""
+
     def reconnect(self) -> tuple[int, str]:
+        self.metrics.record_reconnect()
         self.disconnect()
+        if len(self.replicas) > 1:
+            # The current replica first, it was the one that last worked
+            current = (self.ip, self.port)
+            others = [replica for replica in self.replicas if replica != current]
+            return self._connect_first([current, *others])
         return self.connect(self.ip, self.port)
 
+    def pipeline(self) -> Pipeline:
+        # Commands called inside the context return futures, resolved on exit
+        return Pipeline(self)
+
+    def _read_reply(self) -> tuple[bytes, int]:
+        # The reply and how many bytes it took on the wire
+        if self.binary:
+            (size,) = FRAME.unpack(self.reader.readexactly(FRAME.size))
+            reply = self.reader.readexactly(size & ~COMPRESSED)
+            received = FRAME.size + len(reply)
+            if size & COMPRESSED:
+                reply = zlib.decompress(reply)
+            return reply, received
+        reply = self.reader.readline()
+        received = len(reply) + len(DELIMITER)
+        if self.compression and reply.startswith(COMPRESSED_LINE):
+            data = self.reader.readexactly(int(reply[len(COMPRESSED_LINE) :]))
+            received += len(data)
+            reply = zlib.decompress(data)[: -len(DELIMITER)]
+        return reply, received
+
+    def _call(self, command: str, parse, *args, maxsplit: int = -1, key=None):
+        if key is None:
+            key = self._journal_key(command, args)
+        if key is not None:
+            args = (*args, key)
+            parse = partial(self._acknowledge, parse, key)
+        if self._pipeline is not None:
+            request = self._encode(command, args)
+            return self._pipeline.queue(command, request, parse, maxsplit, key)
+        try:
+            return self._request(command, parse, args, maxsplit)
+        except CONNECTION_ERRORS:
+            # The handshake belongs to connect, which reports its own failure
+            if command == "HI" or self._restore() != 0:
+                raise
+            # Others may have been applied before the connection dropped
+            if command not in IDEMPOTENT_COMMANDS and key is None:
+                raise
+        return self._request(command, parse, args, maxsplit)
+
+    def _request(self, command: str, parse, args: tuple, maxsplit: int):
+        request = self._encode(command, args)
+        outcome, received = "error", 0
+        self.metrics.begin()
+        start = perf_counter()
+        try:
+            self.socket.sendall(request)
+            reply, received = self._read_reply()
+            outcome = "ok"
+        except TimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            self._record(command, start, len(request), received, outcome)
+        return parse(self._decode(reply, maxsplit))
+
+    def _restore(self) -> int:
+        # Reconnects and logs the session back in, 0 once it is usable again
+        for attempt in range(self.RECONNECT_ATTEMPTS):
+            sleep(self._backoff(attempt))
+            error_code, _ = self.reconnect()
+            if error_code != 0:
+                continue
+            if self.credentials is None:
+                return 0
+            parse = partial(self._parse_login, credentials=self.credentials)
+            try:
+                error_code, _ = self._request("LOGIN", parse, self.credentials, -1)
+            except CONNECTION_ERRORS:
+                continue
+            return error_code
+        return 130
+
     def login(self, username: str, password: str) -> tuple[int, str]:
-        self.socket.sendall(f"LOGIN {username} {password}\r\n".encode("utf-8"))
-        response, data = self.socket.recv(1024).decode("utf-8").split()
-        if response.startswith("OK"):
-            self.uuid = data
-            return 0, self.uuid
-        return int(data), ""
+        parse = partial(self._parse_login, credentials=(username, password))
+        if self._pipeline is not None:
+            return self._call("LOGIN", parse, username, password)
+        error_code, uuid = self._call("LOGIN", parse, username, password)
+        if error_code == 0:
+            self.replay_journal()
+        return error_code, uuid
+
+    def replay_journal(self) -> list[tuple[str, int]]:
+        # Sends again, with their original keys, the operations of this account
+        # whose reply never arrived. The server skips the ones it already applied
+        if not self.idempotency:
+            return []
+        results = []
+        for key, command, args in self.journal.pending(self.uuid):
+            error_code, _ = self._call(command, self._parse_status, *args, key=key)
+            results.append((command, error_code))
+        if results:
+            self.balance_cache = None
+        return results
 
     def register(self, username: str, password: str) -> tuple[int, str]:
-        self.socket.sendall(f"REGISTER {username} {password}\r\n".encode("utf-8"))
-        response, *data = self.socket.recv(1024).decode("utf-8").split()
-        if response.startswith("OK"):
-            return 0, ""
-        return int(data[0]), ""
+        return self._call("REGISTER", self._parse_status, username, password)
 
     def logout(self) -> tuple[int, str]:
-        self.socket.sendall("LOGOUT\r\n".encode("utf-8"))
-        # Handles weird bug that raises an exception each two logins
-        self.reconnect()
+        # Logging back in after a reconnect would undo the logout
+        self.credentials = None
+        # Consuming the reply keeps the next LOGIN aligned with its own reply
+        try:
+            self._call("LOGOUT", self._parse_logout)
+        except CONNECTION_ERRORS:
+            # Already reconnected without a session, if the server is back
+            self.uuid = ""
+        except ValueError:
+            # Only reconnect if the server garbled the session
+            self.reconnect()
         # Always succeeds
         return 0, ""
 
-    def balance(self) -> tuple[int, str]:
-        self.socket.sendall("BALANCE\r\n".encode("utf-8"))
-        _, data = self.socket.recv(1024).decode("utf-8").split()
-        # Always succeeds
-        return 0, data
+    def balance(self, refresh: bool = False) -> tuple[int, str]:
+        # Served locally while the last server read is recent enough
+        cached = self._cached_balance()
+        if cached is not None and not refresh and self._pipeline is None:
+            return 0, cached
+        return self._call("BALANCE", self._parse_balance)
 
     def deposit(self, uuid: str, amount: str) -> tuple[int, str]:
-        self.socket.sendall(f"DEPOSIT {uuid} {amount}\r\n".encode("utf-8"))
-        self.socket.recv(1024).decode("utf-8").split()
-        # Always succeeds
-        return 0, ""
+        return self._call(
+            "DEPOSIT",
+            partial(self._parse_transaction, amount=amount, sign=1),
+            uuid,
+            int(amount),
+        )
 
     def withdraw(self, uuid: str, amount: str) -> tuple[int, str]:
-        self.socket.sendall(f"WITH {uuid} {amount}\r\n".encode("utf-8"))
-        response, *data = self.socket.recv(1024).decode("utf-8").split()
-        if response.startswith("OK"):
-            return 0, ""
-        return int(data[0]), ""
+        return self._call(
+            "WITH",
+            partial(self._parse_transaction, amount=amount, sign=-1),
+            uuid,
+            int(amount),
+        )
 
     def transfer(
         self, sender_uuid: str, recv_uuid: str, amount: str
     ) -> tuple[int, str]:
-        self.socket.sendall(
-            f"TRANSFER {sender_uuid} {recv_uuid} {amount}\r\n".encode("utf-8")
+        moved = self._transfer_amount(sender_uuid, recv_uuid, amount)
+        return self._call(
+            "TRANSFER",
+            partial(self._parse_transaction, amount=moved, sign=-1),
+            sender_uuid,
+            recv_uuid,
+            int(amount),
         )
-        response, *data = self.socket.recv(1024).decode("utf-8").split()
-        if response.startswith("OK"):
-            return 0, ""
-        return int(data[0]), ""
 
     def chpasswd(
         self, uuid: str, old_password: str, new_password: str
     ) -> tuple[int, str]:
-        self.socket.sendall(
-            f"CHPASSWD {uuid} {old_password} {new_password}\r\n".encode("utf-8")
+        return self._call(
+            "CHPASSWD",
+            partial(self._parse_password_change, new_password=new_password),
+            uuid,
+            old_password,
+            new_password,
         )
-        response, *data = self.socket.recv(1024).decode("utf-8").split()
-        if response.startswith("OK"):
-            return 0, ""
-        return int(data[0]), ""
 
-    def list_liquors(self) -> tuple[int, str]:
-        self.socket.sendall("LIST\r\n".encode("utf-8"))
-        response, data = self.socket.recv(8096).decode("utf-8").split()
-        if response.startswith("OK"):
-            return 0, data
-        return int(data[0]), ""
+    def list_liquors(self) -> tuple[int, list]:
+        return self._call("LIST", self._parse_list, maxsplit=1)
+
+
+# Same API as Client, but awaitable so the UI event loop never blocks on the server
+class AsyncClient(BaseClient):
+    # Cleared once the server rejects the conditional form of LIST
+    conditional_list = True
+    # Version of the last streamed catalog, and whether it changed
+    catalog_version = ""
+    catalog_modified = True
+    # Counts connections, so requests that failed together reconnect only once
+    generation = 0
+
+    def __init__(self):
+        # Held from sending a request until its whole reply is read
+        self.lock = asyncio.Lock()
+        self.restoring = asyncio.Lock()
+
+    async def connect(self, ip: str, port: str) -> tuple[int, str]:
+        self.ip = ip
+        self.port = port
+        self.journal = Journal(*(self.replicas or [(ip, port)])[0])
+        self.binary = self.compression = self.idempotency = self.ping = False
+        self.generation += 1
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                self._open_connection(ip, port), self.TIMEOUT
+            )
+        except (OSError, asyncio.TimeoutError):
+            RESOLVER.forget(ip, port)
+            return 130, ""
+        self._set_keepalive(self.writer.get_extra_info("socket"))
+        try:
+            error_code, data = await self._call(
+                "HI", self._parse_hi, *self.CAPABILITIES
+            )
+            if error_code != 0 and self.CAPABILITIES:
+                # Older servers refuse a HI with arguments
+                error_code, data = await self._call("HI", self._parse_hi)
+            return error_code, data
+        except CONNECTION_ERRORS:
+            # A late reply to the handshake would answer the next request
+            self.writer.close()
+            return 130, ""
+
+    async def _open_connection(self, host: str, port: str):
+        # Every address of a dual stack name races, IPv6 and IPv4 interleaved
+        sock = await happy_eyeballs(await RESOLVER.resolve_async(host, port))
+        try:
+            return await asyncio.open_connection(sock=sock, limit=self.MAX_LINE)
+        except BaseException:
+            sock.close()
+            raise
+
+    def is_alive(self) -> bool:
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    async def heartbeat(self) -> int:
+        # Run on idle connections, so a dead one is replaced before the next user
+        # action needs it. 0 once the connection is usable
+        generation = self.generation
+        try:
+            if not self.is_alive():
+                raise ConnectionResetError("Connection closed by server")
+            # A request in flight already shows whether the connection works
+            if self.ping and not self.lock.locked():
+                await self._request("PING", self._parse_status, (), -1)
+            return 0
+        except (*CONNECTION_ERRORS, ValueError):
+            return await self._restore(generation)
+
+    async def disconnect(self) -> tuple[int, str]:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except OSError:
+            pass
+        return 0, ""
+
+    async def connect_replicas(
+        self, replicas: list[tuple[str, str]]
+    ) -> tuple[int, str]:
+        # Races the HI handshake on every replica and keeps the first connection
+        # to complete it, the one with the lowest latency
+        self.replicas = replicas
+        if len(replicas) == 1:
+            return await self.connect(*replicas[0])
+        probes = {}
+        for ip, port in replicas:
+            probe = AsyncClient()
+            probe.replicas = replicas
+            probes[asyncio.create_task(probe.connect(ip, port))] = probe
+        winner, result = None, (130, "")
+        pending = set(probes)
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    # A replica that fails the handshake in any way just loses
+                    if task.exception() is not None or task.result()[0] != 0:
+                        if getattr(probes[task], "writer", None) is not None:
+                            probes[task].writer.close()
+                        continue
+                    if winner is None:
+                        winner, result = probes[task], task.result()
+                    else:
+                        await probes[task].disconnect()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for task in pending:
+                # Slower replicas may already have their connection open
+                if getattr(probes[task], "writer", None) is not None:
+                    probes[task].writer.close()
+        if winner is not None:
+            self._adopt(winner)
+        return result
+
+    def _adopt(self, probe: "AsyncClient") -> None:
+        # Takes over the connection of a probe and what its HI negotiated
+        for name in (
+            "ip",
+            "port",
+            "journal",
+            "reader",
+            "writer",
+            "server",
+            "capabilities",
+            "binary",
+            "compression",
+            "idempotency",
+            "ping",
+        ):
+            setattr(self, name, getattr(probe, name))
+        self.generation += 1
+
+    async def reconnect(self) -> tuple[int, str]:
+        self.metrics.record_reconnect()
+        await self.disconnect()
+        if len(self.replicas) > 1:
+            # Fails over to whichever replica is healthy and fastest now
+            return await self.connect_replicas(self.replicas)
+        return await self.connect(self.ip, self.port)
+
+    async def _inflate(self, size: int) -> bytes:
+        # Decompresses each chunk while the rest of the reply is still arriving
+        decompressor = zlib.decompressobj()
+        reply = bytearray()
+        while size:
+            data = await self.reader.read(min(size, 64 * 1024))
+            if not data:
+                raise ConnectionResetError("Connection closed by server")
+            size -= len(data)
+            reply += decompressor.decompress(data)
+        reply += decompressor.flush()
+        return bytes(reply)
+
+    async def _read_reply(self) -> tuple[bytes, int]:
+        # The reply and how many bytes it took on the wire
+        if self.binary:
+            (size,) = FRAME.unpack(await self.reader.readexactly(FRAME.size))
+            received = FRAME.size + (size & ~COMPRESSED)
+            if size & COMPRESSED:
+                return await self._inflate(size & ~COMPRESSED), received
+            return await self.reader.readexactly(size), received
+        reply = await self.reader.readuntil(DELIMITER)
+        received = len(reply)
+        if self.compression and reply.startswith(COMPRESSED_LINE):
+            size = int(reply[len(COMPRESSED_LINE) : -len(DELIMITER)])
+            reply = await self._inflate(size)
+            received += size
+        return reply[: -len(DELIMITER)], received
+
+    async def _call(
+        self, command: str, parse, *args, maxsplit: int = -1, key=None
+    ) -> tuple[int, str]:
+        if key is None and command in JOURNALED_COMMANDS and self.idempotency:
+            # The journal waits for the disk, so it is written off the event loop
+            key = await asyncio.to_thread(self.journal.add, command, args)
+        if key is not None:
+            args = (*args, key)
+        generation = self.generation
+        try:
+            result = await self._request(command, parse, args, maxsplit)
+        except CONNECTION_ERRORS:
+            # The handshake belongs to connect, which reports its own failure
+            if command == "HI" or await self._restore(generation) != 0:
+                raise
+            # Others may have been applied before the connection dropped
+            if command not in IDEMPOTENT_COMMANDS and key is None:
+                raise
+            result = await self._request(command, parse, args, maxsplit)
+        if key is not None:
+            # Any reply means the server decided, applied or not
+            self.journal.remove(key)
+        return result
+
+    async def _request(
+        self, command: str, parse, args: tuple, maxsplit: int
+    ) -> tuple[int, str]:
+        request = self._encode(command, args)
+        outcome, received = "error", 0
+        # One request at a time, so every reply reaches the command that asked
+        async with self.lock:
+            self.metrics.begin()
+            start = perf_counter()
+            try:
+                self.writer.write(request)
+                await self.writer.drain()
+                reply, received = await asyncio.wait_for(
+                    self._read_reply(), self.TIMEOUT
+                )
+                outcome = "ok"
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise
+            except asyncio.CancelledError:
+                # A reply left half read would answer the next request, so the
+                # connection is closed and replaced on its next use
+                self.writer.close()
+                raise
+            finally:
+                self._record(command, start, len(request), received, outcome)
+        return parse(self._decode(reply, maxsplit))
+
+    async def _restore(self, generation: int) -> int:
+        # Reconnects and logs the session back in, 0 once it is usable again
+        async with self.restoring:
+            if self.generation != generation:
+                # Another request already reconnected
+                return 0 if self.is_alive() else 130
+            for attempt in range(self.RECONNECT_ATTEMPTS):
+                await asyncio.sleep(self._backoff(attempt))
+                error_code, _ = await self.reconnect()
+                if error_code != 0:
+                    continue
+                if self.credentials is None:
+                    return 0
+                parse = partial(self._parse_login, credentials=self.credentials)
+                try:
+                    error_code, _ = await self._request(
+                        "LOGIN", parse, self.credentials, -1
+                    )
+                except CONNECTION_ERRORS:
+                    continue
+                return error_code
+            return 130
+
+    async def login(self, username: str, password: str) -> tuple[int, str]:
+        parse = partial(self._parse_login, credentials=(username, password))
+        error_code, uuid = await self._call("LOGIN", parse, username, password)
+        if error_code == 0:
+            await self.replay_journal()
+        return error_code, uuid
+
+    async def replay_journal(self) -> list[tuple[str, int]]:
+        # Sends again, with their original keys, the operations of this account
+        # whose reply never arrived. The server skips the ones it already applied
+        if not self.idempotency:
+            return []
+        results = []
+        for key, command, args in await asyncio.to_thread(
+            self.journal.pending, self.uuid
+        ):
+            error_code, _ = await self._call(
+                command, self._parse_status, *args, key=key
+            )
+            results.append((command, error_code))
+        if results:
+            self.balance_cache = None
+        return results
+
+    async def register(self, username: str, password: str) -> tuple[int, str]:
+        return await self._call("REGISTER", self._parse_status, username, password)
+
+    async def logout(self) -> tuple[int, str]:
+        # Logging back in after a reconnect would undo the logout
+        self.credentials = None
+        # Consuming the reply keeps the next LOGIN aligned with its own reply
+        try:
+            await self._call("LOGOUT", self._parse_logout)
+        except CONNECTION_ERRORS:
+            # Already reconnected without a session, if the server is back
+            self.uuid = ""
+        except ValueError:
+            # Only reconnect if the server garbled the session
+            await self.reconnect()
+        # Always succeeds
+        return 0, ""
+
+    async def balance(self, refresh: bool = False) -> tuple[int, str]:
+        # Served locally while the last server read is recent enough
+        cached = self._cached_balance()
+        if cached is not None and not refresh:
+            return 0, cached
+        return await self._call("BALANCE", self._parse_balance)
+
+    async def deposit(self, uuid: str, amount: str) -> tuple[int, str]:
+        return await self._call(
+            "DEPOSIT",
+            partial(self._parse_transaction, amount=amount, sign=1),
+            uuid,
+            int(amount),
+        )
+
+    async def withdraw(self, uuid: str, amount: str) -> tuple[int, str]:
+        return await self._call(
+            "WITH",
+            partial(self._parse_transaction, amount=amount, sign=-1),
+            uuid,
+            int(amount),
+        )
+
+    async def transfer(
+        self, sender_uuid: str, recv_uuid: str, amount: str
+    ) -> tuple[int, str]:
+        moved = self._transfer_amount(sender_uuid, recv_uuid, amount)
+        return await self._call(
+            "TRANSFER",
+            partial(self._parse_transaction, amount=moved, sign=-1),
+            sender_uuid,
+            recv_uuid,
+            int(amount),
+        )
+
+    async def chpasswd(
+        self, uuid: str, old_password: str, new_password: str
+    ) -> tuple[int, str]:
+        return await self._call(
+            "CHPASSWD",
+            partial(self._parse_password_change, new_password=new_password),
+            uuid,
+            old_password,
+            new_password,
+        )
+
+    async def list_liquors(self) -> tuple[int, list]:
+        return await self._call("LIST", self._parse_list, maxsplit=1)
+
+    async def stream_liquors(
+        self, version: str | None = None, chunk_size: int = 64 * 1024
+    ):
+        # Yields (error_code, items) batches as soon as each chunk is parsed, and
+        # nothing when the catalog still matches the given version
+        generation = self.generation
+        started = False
+        try:
+            # Closing this generator early closes the inner one right away, so
+            # the lock isn't held until garbage collection
+            async with aclosing(self._stream_liquors(version, chunk_size)) as batches:
+                async for batch in batches:
+                    started = True
+                    yield batch
+            return
+        except CONNECTION_ERRORS:
+            # Replaying after some batches were yielded would repeat them
+            if await self._restore(generation) != 0 or started:
+                raise
+        async with aclosing(self._stream_liquors(version, chunk_size)) as batches:
+            async for batch in batches:
+                yield batch
+
+    async def _stream_liquors(self, version: str | None, chunk_size: int):
+        if self.binary:
+            # The whole catalog is a single frame, decoded column by column
+            error_code, items = await self._request(
+                "LIST", self._parse_catalog, (version or "-",), -1
+            )
+            if error_code != 0 or items:
+                yield error_code, items
+            return
+        command = "LIST"
+        if self.conditional_list:
+            command = f"LIST {version or '-'}"
+        request = f"{command}\r\n".encode("utf-8")
+        parser = JsonArrayParser()
+        outcome, received = "error", 0
+        # Compressed bytes left, None while the reply is plain text
+        remaining = None
+        async with self.lock:
+            self.metrics.begin()
+            start = perf_counter()
+            try:
+                self.writer.write(request)
+                await self.writer.drain()
+                if self.compression:
+                    # Every reply is at least as long as the compression marker
+                    data = await asyncio.wait_for(
+                        self.reader.readexactly(len(COMPRESSED_LINE)), self.TIMEOUT
+                    )
+                    received += len(data)
+                    if data == COMPRESSED_LINE:
+                        header = await asyncio.wait_for(
+                            self.reader.readuntil(DELIMITER), self.TIMEOUT
+                        )
+                        received += len(header)
+                        remaining = int(header[: -len(DELIMITER)])
+                        decompressor = zlib.decompressobj()
+                    else:
+                        parser.feed(data)
+                while not parser.done:
+                    size = (
+                        chunk_size if remaining is None else min(chunk_size, remaining)
+                    )
+                    data = await asyncio.wait_for(self.reader.read(size), self.TIMEOUT)
+                    if not data:
+                        raise ConnectionResetError("Connection closed by server")
+                    received += len(data)
+                    if remaining is not None:
+                        remaining -= len(data)
+                        data = decompressor.decompress(data)
+                        if remaining == 0:
+                            data += decompressor.flush()
+                    items = parser.feed(data)
+                    if items:
+                        yield 0, items
+                outcome = "ok"
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise
+            except (asyncio.CancelledError, GeneratorExit):
+                # Cancelled or closed halfway through the reply, the rest of it
+                # would answer the next request
+                if not parser.done or remaining:
+                    self.writer.close()
+                raise
+            finally:
+                self._record("LIST", start, len(request), received, outcome)
+
+        if parser.error_code in (253, 254) and self.conditional_list:
+            # Older servers only know the plain LIST
+            self.conditional_list = False
+            async for batch in self._stream_liquors(None, chunk_size):
+                yield batch
+            return
+        self.catalog_version = parser.trailer
+        self.catalog_modified = not parser.not_modified
+        if parser.error_code != 0:
+            yield parser.error_code, []
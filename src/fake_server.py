@@ -0,0 +1,309 @@
+import asyncio
+import random
+from argparse import ArgumentParser
+from array import array
+from hashlib import sha1
+from json import dumps
+from threading import Event, Thread
+from uuid import UUID, uuid4
+
+from binary import FRAME, NOT_MODIFIED, compress_frame, decode_request, encode_reply
+from framing import compress_line
+
+NAMES = ["Aguardiente", "Ron", "Whisky", "Vodka", "Tequila", "Ginebra", "Vino"]
+COUNTRIES = ["CO", "CU", "GB", "RU", "MX", "NL", "CL", "AR", "ES", "FR"]
+
+# Status and fields, rendered as a text line or a binary frame
+Reply = tuple[int, list]
+# End with an idempotency key once the session accepted the capability
+KEYED_COMMANDS = {"DEPOSIT", "WITH", "TRANSFER"}
+
+
+def render_text(status: int, fields: list) -> str:
+    if status == NOT_MODIFIED:
+        return " ".join(["NOTMODIFIED", *fields])
+    if status != 0:
+        return f"ERROR {status}"
+    return " ".join(["OK", *map(str, fields)])
+
+
+def make_catalog(size: int, seed: int = 0) -> list[list]:
+    rng = random.Random(seed)
+    return [
+        [
+            str(UUID(int=rng.getrandbits(128), version=4)),
+            f"{rng.choice(NAMES)}_{i}",
+            rng.choice(COUNTRIES),
+            rng.randint(0, 500),
+            round(rng.uniform(5, 500), 2),
+        ]
+        for i in range(size)
+    ]
+
+
+class FakeServer:
+    def __init__(
+        self,
+        kind: str = "bank",
+        latency: float = 0.0,
+        fragment_size: int = 0,
+        catalog_size: int = 20,
+        seed: int = 0,
+        capabilities: tuple[str, ...] = ("binary", "idempotency", "ping", "zlib"),
+        compression_threshold: int = 1024,
+    ):
+        self.kind = kind
+        self.latency = latency
+        # Replies are written in chunks of this many bytes, 0 writes them whole
+        self.fragment_size = fragment_size
+        # Accepted in the HI handshake, none behaves like an older server
+        self.capabilities = capabilities
+        # With zlib, replies longer than this many bytes are compressed
+        self.compression_threshold = compression_threshold
+        self.catalog = make_catalog(catalog_size, seed)
+        # The same catalog as columns, for binary replies
+        uuids, names, origins, stock, price = list(zip(*self.catalog)) or [()] * 5
+        self.columns = [
+            list(uuids),
+            list(names),
+            list(origins),
+            array("i", stock),
+            array("d", price),
+        ]
+        digest = sha1(dumps(self.catalog).encode("utf-8"))
+        self.catalog_version = digest.hexdigest()[:16]
+        self.owner_uuid = str(uuid4())
+        self.connected_users = 0
+        self.users: dict[str, list[str]] = {}
+        self.balances: dict[str, int] = {}
+        # Replies to money moving commands by idempotency key, a retry gets the
+        # stored reply instead of moving the money again
+        self.applied: dict[str, Reply] = {}
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8888) -> None:
+        await self.start(host, port)
+        async with self.server:
+            await self.server.serve_forever()
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        # Runs the server on its own event loop so blocking clients can use it
+        ready = Event()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self.port = self.loop.run_until_complete(self.start(host, port))
+            ready.set()
+            self.loop.run_forever()
+
+        Thread(target=run, daemon=True).start()
+        ready.wait()
+        return self.port
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        session = {
+            "uuid": "",
+            "binary": False,
+            "compression": False,
+            "idempotency": False,
+        }
+        self.connected_users += 1
+        try:
+            while True:
+                # A HI switches protocols only after its own text reply
+                binary, compression = session["binary"], session["compression"]
+                if binary:
+                    (size,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+                    command, args = decode_request(await reader.readexactly(size))
+                    status, fields = self.execute(session, [command, *args])
+                    reply = encode_reply(status, fields)
+                else:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    status, fields = self.execute(session, line.decode("utf-8").split())
+                    reply = f"{render_text(status, fields)}\r\n".encode("utf-8")
+                if compression and len(reply) > self.compression_threshold:
+                    reply = compress_frame(reply) if binary else compress_line(reply)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                await self.send(writer, reply)
+        except (ConnectionError, EOFError, KeyError, ValueError):
+            pass
+        finally:
+            self.connected_users -= 1
+            writer.close()
+
+    async def send(self, writer: asyncio.StreamWriter, data: bytes) -> None:
+        if not self.fragment_size:
+            writer.write(data)
+            await writer.drain()
+            return
+        for start in range(0, len(data), self.fragment_size):
+            writer.write(data[start : start + self.fragment_size])
+            await writer.drain()
+            # Yield so each fragment leaves as its own segment
+            await asyncio.sleep(0)
+
+    def execute(self, session: dict, request: list) -> Reply:
+        if not request:
+            return 254, []
+        command, *args = request
+        handler = getattr(self, f"cmd_{command.lower()}", None)
+        if handler is None:
+            return 254, []
+        key = None
+        if session["idempotency"] and command in KEYED_COMMANDS:
+            if not args:
+                return 253, []
+            *args, key = args
+            if key in self.applied:
+                return self.applied[key]
+        try:
+            reply = handler(session, *args)
+        except (TypeError, ValueError):
+            return 253, []
+        if key is not None:
+            self.applied[key] = reply
+        return reply
+
+    def cmd_hi(self, session: dict, *capabilities: str) -> Reply:
+        accepted = [name for name in capabilities if name in self.capabilities]
+        session["binary"] = "binary" in accepted
+        session["compression"] = "zlib" in accepted
+        session["idempotency"] = "idempotency" in accepted
+        return 0, [self.kind, *accepted]
+
+    def cmd_ping(self, _: dict) -> Reply:
+        return 0, []
+
+    def cmd_register(self, _: dict, username: str, password: str) -> Reply:
+        if username in self.users:
+            return 2, []
+        uuid = str(uuid4())
+        self.users[username] = [password, uuid]
+        self.balances[uuid] = 0
+        return 0, []
+
+    def cmd_login(self, session: dict, username: str, password: str) -> Reply:
+        if self.users.get(username, [None])[0] != password:
+            return 1, []
+        session["uuid"] = self.users[username][1]
+        return 0, [session["uuid"]]
+
+    def cmd_logout(self, session: dict) -> Reply:
+        session["uuid"] = ""
+        return 0, []
+
+    def cmd_balance(self, session: dict) -> Reply:
+        if not session["uuid"]:
+            return 251, []
+        return 0, [self.balances[session["uuid"]]]
+
+    def cmd_deposit(self, session: dict, uuid: str, amount: str | int) -> Reply:
+        if session["uuid"] != uuid:
+            return 251, []
+        self.balances[uuid] += int(amount)
+        return 0, []
+
+    def cmd_with(self, session: dict, uuid: str, amount: str | int) -> Reply:
+        if session["uuid"] != uuid:
+            return 251, []
+        if self.balances[uuid] < int(amount):
+            return 3, []
+        self.balances[uuid] -= int(amount)
+        return 0, []
+
+    def cmd_transfer(
+        self, session: dict, sender_uuid: str, recv_uuid: str, amount: str | int
+    ) -> Reply:
+        if session["uuid"] != sender_uuid:
+            return 251, []
+        if recv_uuid not in self.balances:
+            return 252, []
+        if self.balances[sender_uuid] < int(amount):
+            return 3, []
+        self.balances[sender_uuid] -= int(amount)
+        self.balances[recv_uuid] += int(amount)
+        return 0, []
+
+    def cmd_chpasswd(
+        self, session: dict, uuid: str, old_password: str, new_password: str
+    ) -> Reply:
+        if session["uuid"] != uuid:
+            return 251, []
+        for user in self.users.values():
+            if user[1] == uuid:
+                if user[0] != old_password:
+                    return 1, []
+                user[0] = new_password
+                return 0, []
+        return 252, []
+
+    def cmd_list(self, session: dict, version: str | None = None) -> Reply:
+        # "LIST <version>" replies NOTMODIFIED while the catalog is unchanged,
+        # "-" asks for the catalog and its version
+        if self.kind != "liquor_store":
+            return 254, []
+        if version == self.catalog_version:
+            return NOT_MODIFIED, [self.catalog_version]
+        if session["binary"]:
+            fields = [*self.columns, self.connected_users, self.owner_uuid]
+        else:
+            payload = self.catalog + [self.connected_users, self.owner_uuid]
+            fields = [dumps(payload, separators=(",", ":"))]
+        return 0, fields if version is None else [*fields, self.catalog_version]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = ArgumentParser(description="Local stand-in TeleGods server")
+    parser.add_argument("--ip", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--kind", choices=["bank", "liquor_store"], default="bank")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--fragment-size", type=int, default=0, help="bytes")
+    parser.add_argument("--catalog-size", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--text-only", action="store_true", help="refuse the binary protocol"
+    )
+    parser.add_argument(
+        "--no-compression", action="store_true", help="refuse zlib compression"
+    )
+    parser.add_argument(
+        "--no-idempotency", action="store_true", help="refuse idempotency keys"
+    )
+    parser.add_argument("--no-ping", action="store_true", help="refuse PING")
+    args = parser.parse_args(argv)
+    capabilities = [
+        name
+        for name, refused in (
+            ("binary", args.text_only),
+            ("idempotency", args.no_idempotency),
+            ("ping", args.no_ping),
+            ("zlib", args.no_compression),
+        )
+        if not refused
+    ]
+
+    server = FakeServer(
+        args.kind,
+        args.latency,
+        args.fragment_size,
+        args.catalog_size,
+        args.seed,
+        tuple(capabilities),
+    )
+    try:
+        asyncio.run(server.serve_forever(args.ip, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import zlib
+from codecs import getincrementaldecoder
+from json import JSONDecoder
+from socket import socket
+
+DELIMITER = b"\r\n"
+# With the zlib capability, a long reply line may arrive as "Z <size>\r\n"
+# followed by that many bytes of a zlib stream of the whole line
+COMPRESSED = b"Z "
+# Replies are compressed on the fly, so speed matters more than ratio
+COMPRESSION_LEVEL = 1
+
+
+class LineReader:
+    def __init__(self, sock: socket, chunk_size: int = 4096):
+        self.socket = sock
+        self.buffer = bytearray()
+        # Receive straight into a preallocated chunk, never into a new bytes object
+        self.chunk = bytearray(chunk_size)
+        self.view = memoryview(self.chunk)
+        # Bytes at the start of the buffer already known not to hold a delimiter
+        self.scanned = 0
+
+    def readline(self) -> bytes:
+        while True:
+            index = self.buffer.find(DELIMITER, self.scanned)
+            if index != -1:
+                line = bytes(self.buffer[:index])
+                del self.buffer[: index + len(DELIMITER)]
+                self.scanned = 0
+                return line
+
+            # A delimiter may be split between two segments
+            self.scanned = max(len(self.buffer) - len(DELIMITER) + 1, 0)
+            received = self.socket.recv_into(self.view)
+            if received == 0:
+                raise ConnectionResetError("Connection closed by server")
+            self.buffer += self.view[:received]
+
+    def readexactly(self, size: int) -> bytes:
+        while len(self.buffer) < size:
+            received = self.socket.recv_into(self.view)
+            if received == 0:
+                raise ConnectionResetError("Connection closed by server")
+            self.buffer += self.view[:received]
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        self.scanned = 0
+        return data
+
+
+def compress_line(line: bytes) -> bytes:
+    data = zlib.compress(line, COMPRESSION_LEVEL)
+    return COMPRESSED + str(len(data)).encode("utf-8") + DELIMITER + data
+
+
+class JsonArrayParser:
+    # Parses an "OK [...] [version]" reply as it arrives, returning each complete
+    # item, or a "NOTMODIFIED <version>" reply to a conditional request
+    WHITESPACE = " \t\r\n"
+
+    def __init__(self):
+        self.decoder = JSONDecoder()
+        self.text = getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.position = 0
+        self.state = "status"
+        self.error_code = 0
+        self.not_modified = False
+        # Whatever follows the array on the reply line, like a catalog version
+        self.trailer = ""
+        self.done = False
+
+    def skip(self, characters: str) -> None:
+        while (
+            self.position < len(self.buffer)
+            and self.buffer[self.position] in characters
+        ):
+            self.position += 1
+
+    def feed(self, data: bytes) -> list:
+        self.buffer += self.text.decode(data)
+        items = []
+        while not self.done and self.position < len(self.buffer):
+            match self.state:
+                case "status":
+                    if self.buffer.startswith("OK "):
+                        self.position = len("OK ")
+                        self.state = "open"
+                    elif (end := self.buffer.find("\r\n")) != -1:
+                        response, *data = self.buffer[:end].split()
+                        if response == "NOTMODIFIED":
+                            self.not_modified = True
+                            self.trailer = data[0] if data else ""
+                        else:
+                            self.error_code = int(data[0]) if data else 255
+                        self.done = True
+                    else:
+                        break
+                case "open":
+                    self.skip(self.WHITESPACE)
+                    if self.position < len(self.buffer):
+                        if self.buffer[self.position] != "[":
+                            raise ValueError("Expected a JSON array")
+                        self.position += 1
+                        self.state = "items"
+                case "items":
+                    self.skip(self.WHITESPACE + ",")
+                    if self.position == len(self.buffer):
+                        break
+                    if self.buffer[self.position] == "]":
+                        self.position += 1
+                        self.state = "end"
+                        continue
+                    try:
+                        item, end = self.decoder.raw_decode(self.buffer, self.position)
+                    except ValueError:
+                        # Incomplete item, wait for more data
+                        break
+                    # A number at the very end may still continue in the next chunk
+                    if end == len(self.buffer):
+                        break
+                    items.append(item)
+                    self.position = end
+                case "end":
+                    end = self.buffer.find("\n", self.position)
+                    if end == -1:
+                        break
+                    self.trailer = self.buffer[self.position : end].strip()
+                    self.position = end + 1
+                    self.done = True
+
+        # Drop everything already parsed
+        self.buffer = self.buffer[self.position :]
+        self.position = 0
+        return items
@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from threading import Lock
+from time import time
+from uuid import uuid4
+
+try:
+    import fcntl
+except ImportError:
+    # Without it only the threads of one process are serialized
+    fcntl = None
+
+# Held by every journal of this process while it rewrites its file
+LOCK = Lock()
+# Changes waiting for the next write, per file
+QUEUED: dict[str, dict[str, list | None]] = {}
+QUEUE_LOCK = Lock()
+
+
+def merge(entries: dict[str, list], changes: dict[str, list | None]) -> dict:
+    # None marks a removed entry
+    merged = {**entries, **changes}
+    return {key: entry for key, entry in merged.items() if entry is not None}
+
+
+class Journal:
+    # Money moving commands the server hasn't answered yet, one file per server.
+    # Each entry keeps its idempotency key, so sending it again is safe. Several
+    # clients may share the file, so every change is merged with what is on disk
+    def __init__(self, ip: str, port: str, max_age: float = 24 * 60 * 60):
+        directory = os.getenv("XDG_STATE_HOME") or os.path.expanduser("~/.local/state")
+        name = f"journal-{ip.replace(':', '_')}-{port}.json"
+        self.path = os.path.join(directory, "telegods", name)
+        # Older entries are dropped, the server won't remember their keys anymore
+        self.max_age = max_age
+        self.entries: dict[str, list] = self.load()
+
+    def load(self) -> dict[str, list]:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        oldest = time() - self.max_age
+        return {key: entry for key, entry in entries.items() if entry[2] >= oldest}
+
+    @contextmanager
+    def locked(self):
+        # Callers hold LOCK, this one keeps out the other processes
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f"{self.path}.lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def save(self, entries: dict[str, list], durable: bool) -> None:
+        # Readers never see a half written file
+        descriptor, temporary = tempfile.mkstemp(
+            dir=os.path.dirname(self.path), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                json.dump(entries, file)
+                if durable:
+                    file.flush()
+                    os.fsync(file.fileno())
+            os.replace(temporary, self.path)
+        except OSError:
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            raise
+
+    def flush(self) -> None:
+        with LOCK:
+            # Whoever gets the lock writes every change queued so far, so clients
+            # sending at the same time share one write and one fsync
+            with QUEUE_LOCK:
+                changes = QUEUED.pop(self.path, {})
+            try:
+                with self.locked():
+                    entries = merge(self.load(), changes)
+                    if changes:
+                        self.save(entries, durable=any(changes.values()))
+            except OSError:
+                # Kept in memory for this session at least
+                entries = merge(self.entries, changes)
+            self.entries = entries
+
+    def add(self, command: str, args: tuple) -> str:
+        key = uuid4().hex
+        with QUEUE_LOCK:
+            QUEUED.setdefault(self.path, {})[key] = [command, list(args), time()]
+        self.flush()
+        return key
+
+    def remove(self, key: str) -> None:
+        # Written along with the next addition. Until then a crash only replays
+        # a key the server already knows
+        with QUEUE_LOCK:
+            QUEUED.setdefault(self.path, {})[key] = None
+        self.entries.pop(key, None)
+
+    def pending(self, owner_uuid: str) -> list[tuple[str, str, list]]:
+        # Oldest first, only the ones sent from the given account
+        self.flush()
+        return [
+            (key, command, args)
+            for key, (command, args, _) in sorted(
+                self.entries.items(), key=lambda entry: entry[1][2]
+            )
+            if args and args[0] == owner_uuid
+        ]
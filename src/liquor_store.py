@@ -0,0 +1,222 @@
+from rich.segment import Segment
+from textual.app import ComposeResult
+from textual.containers import Container
+from textual.geometry import Size
+from textual.screen import Screen
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.widgets import (
+    Button,
+    Header,
+    Footer,
+    Input,
+    Static,
+)
+from collections.abc import Sequence
+
+from catalog import Catalog
+from catalog_cache import CatalogCache
+from client import CONNECTION_ERRORS, AsyncClient
+from pool import POOL
+from widgets import Timeout
+
+
+class CatalogView(ScrollView, can_focus=True):
+    # Renders only the lines in the viewport, rows are never widgets
+    COMPONENT_CLASSES = {"catalog-view--header", "catalog-view--odd-row"}
+    DEFAULT_CSS = """
+    CatalogView > .catalog-view--header {
+        text-style: bold;
+        background: $primary;
+    }
+    CatalogView > .catalog-view--odd-row {
+        background: $boost;
+    }
+    """
+    FORMAT = "{:<36}{:<8}{:>8}{:>14}"
+    WIDTH = 66
+
+    def __init__(self, catalog: Catalog, *, id: str | None = None):
+        super().__init__(id=id)
+        self.catalog = catalog
+        # Catalog row numbers in display order
+        self.order: Sequence[int] = range(0)
+
+    def show(self, order: Sequence[int]) -> None:
+        self.order = order
+        # One extra line for the column header
+        self.virtual_size = Size(self.WIDTH, len(self.order) + 1)
+        self.refresh()
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        width = self.size.width
+        if y == 0:
+            text = self.FORMAT.format("Liquor", "Origin", "Stock", "Price")
+            style = self.get_component_rich_style("catalog-view--header")
+        else:
+            index = scroll_y + y - 1
+            if index >= len(self.order):
+                return Strip.blank(width, self.rich_style)
+            _, commercial_name, cc, stock, price = self.catalog.row(self.order[index])
+            text = self.FORMAT.format(commercial_name, cc, stock, f"{price:.2f} ＴＣ")
+            style = self.rich_style
+            if index % 2:
+                style += self.get_component_rich_style("catalog-view--odd-row")
+        strip = Strip([Segment(text, style)])
+        return strip.crop_extend(scroll_x, scroll_x + width, style)
+
+
+class LiquorStoreMainMenu(Screen):
+    BINDINGS = [
+        ("n", "sort('name')", "Sort by name"),
+        ("p", "sort('price')", "Sort by price"),
+        ("s", "sort('stock')", "Sort by stock"),
+        ("c", "toggle_cheap", "Under 50 ＴＣ"),
+        ("i", "toggle_in_stock", "In stock"),
+    ]
+    CHEAP_PRICE = 50
+    SEARCH_DEBOUNCE = 0.15
+
+    def __init__(self, client: AsyncClient):
+        super().__init__()
+        self.client = client
+        self.catalog = Catalog()
+        self.catalog_loading = True
+        self.sort = None
+        self.max_price = None
+        self.in_stock = False
+        self.search = ""
+        self.search_timer = None
+        self.connected_users = 0
+        self.OWNER_UUID = ""
+
+    TEXT = "Welcome to TeleGods Liquor Store, choose your poison!"
+
+    def compose(self) -> ComposeResult:
+        yield Header(show_clock=True)
+        yield Footer()
+        yield Container(
+            Static(self.TEXT, classes="text"),
+            Static("Loading catalog...", id="catalog-status"),
+            Input(placeholder="Search by name or origin", id="search"),
+            CatalogView(self.catalog, id="liquors"),
+            id="store",
+        )
+        yield Container(
+            Button(label="Back", variant="error", id="back", classes="large-button"),
+            classes="horizontal-selection",
+        )
+
+    def on_mount(self) -> None:
+        # Rows are added while the rest of the catalog is still arriving
+        self.loader = self.run_worker(self.load_liquors(), exclusive=True)
+
+    async def load_liquors(self) -> None:
+        try:
+            await self.fetch_catalog()
+        finally:
+            # Errors and a cancelled load keep the rows that arrived usable
+            self.catalog_loading = False
+
+    async def fetch_catalog(self) -> None:
+        view = self.query_one("#liquors", CatalogView)
+        status = self.query_one("#catalog-status", Static)
+        cache = CatalogCache(self.client.ip, self.client.port)
+        cached = cache.load()
+        if cached is None or not cache.is_fresh():
+            # Only a changed catalog is downloaded again
+            version = cache.version if cached is not None else None
+            metadata = []
+            try:
+                async for error_code, items in self.client.stream_liquors(version):
+                    if not self.is_attached:
+                        return
+                    if error_code != 0:
+                        status.update(f"Couldn't load the catalog (error {error_code})")
+                        return
+                    rows = [item for item in items if isinstance(item, list)]
+                    # The catalog ends with the connected users and the owner UUID
+                    metadata.extend(
+                        item for item in items if not isinstance(item, list)
+                    )
+                    self.catalog.extend(rows)
+                    # Sorted or filtered views are rebuilt once the catalog is complete
+                    if (
+                        self.sort is None
+                        and self.max_price is None
+                        and not self.in_stock
+                        and not self.search
+                    ):
+                        view.show(range(len(self.catalog)))
+                    status.update(f"{len(self.catalog)} liquors loaded...")
+            except CONNECTION_ERRORS:
+                self.app.push_screen(Timeout())
+                return
+            if self.client.catalog_modified:
+                cached = None
+                if len(metadata) >= 2:
+                    self.connected_users, self.OWNER_UUID = metadata[-2:]
+                cache.save(self.catalog, self.client.catalog_version, self.OWNER_UUID)
+            else:
+                cache.touch()
+        if not self.is_attached:
+            return
+        if cached is not None:
+            self.catalog = view.catalog = cached
+            self.OWNER_UUID = cache.owner_uuid
+        self.catalog_loading = False
+        # Sorting the prefix index now keeps the first keystroke fast
+        self.catalog.search_index.sort_tokens()
+        self.update_view()
+
+    def update_view(self) -> None:
+        # A debounced search may fire after the screen was closed
+        if not self.is_attached:
+            return
+        matches = self.catalog.search(self.search)
+        order = self.catalog.view(self.sort, self.max_price, self.in_stock, matches)
+        self.query_one("#liquors", CatalogView).show(order)
+        if self.catalog_loading:
+            return
+        details = []
+        if self.sort is not None:
+            details.append(f"sorted by {self.sort}")
+        if self.max_price is not None:
+            details.append(f"under {self.max_price} ＴＣ")
+        if self.in_stock:
+            details.append("in stock")
+        if self.search:
+            details.append(f"matching '{self.search}'")
+        self.query_one("#catalog-status", Static).update(
+            f"{len(order)} of {len(self.catalog)} liquors available"
+            + (f" ({', '.join(details)})" if details else "")
+        )
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        # Only the last keystroke of a burst triggers a search
+        self.search = event.value
+        if self.search_timer is not None:
+            self.search_timer.stop()
+        self.search_timer = self.set_timer(self.SEARCH_DEBOUNCE, self.update_view)
+
+    def action_sort(self, key: str) -> None:
+        # Pressing the same key again goes back to the catalog order
+        self.sort = None if self.sort == key else key
+        self.update_view()
+
+    def action_toggle_cheap(self) -> None:
+        self.max_price = None if self.max_price is not None else self.CHEAP_PRICE
+        self.update_view()
+
+    def action_toggle_in_stock(self) -> None:
+        self.in_stock = not self.in_stock
+        self.update_view()
+
+    def on_button_pressed(self, _: Button.Pressed) -> None:
+        # A catalog still loading is abandoned, a half read reply closes the
+        # connection so the pool opens a new one
+        self.loader.cancel()
+        # The connection stays warm in the pool for the next visit
+        POOL.release(self.client)
+        self.app.pop_screen()
@@ -0,0 +1,152 @@
+from bisect import bisect_left
+from collections import deque
+from json import dumps
+from threading import Lock
+from time import perf_counter
+
+# Upper bounds in seconds, the last bucket catches everything else
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class CommandStats:
+    def __init__(self):
+        self.count = 0
+        self.latency_sum = 0.0
+        self.last_latency = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "latency_sum": self.latency_sum,
+            "buckets": dict(zip([*map(str, BUCKETS), "+Inf"], self.buckets)),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = Lock()
+        self.commands: dict[str, CommandStats] = {}
+        self.reconnects = 0
+        self.in_flight = 0
+        self.hooks = []
+
+    def add_hook(self, hook) -> None:
+        # Called as hook(command, latency, bytes_sent, bytes_received, outcome)
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook) -> None:
+        self.hooks.remove(hook)
+
+    def begin(self, count: int = 1) -> None:
+        # Every begun request must end with a record call
+        with self.lock:
+            self.in_flight += count
+
+    def record(
+        self,
+        command: str,
+        latency: float,
+        bytes_sent: int,
+        bytes_received: int,
+        outcome: str = "ok",
+    ) -> None:
+        with self.lock:
+            self.in_flight = max(self.in_flight - 1, 0)
+            stats = self.commands.get(command)
+            if stats is None:
+                stats = self.commands[command] = CommandStats()
+            stats.count += 1
+            stats.latency_sum += latency
+            stats.last_latency = latency
+            stats.buckets[bisect_left(BUCKETS, latency)] += 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            if outcome == "timeout":
+                stats.timeouts += 1
+            elif outcome != "ok":
+                stats.errors += 1
+        for hook in self.hooks:
+            hook(command, latency, bytes_sent, bytes_received, outcome)
+
+    def record_reconnect(self) -> None:
+        with self.lock:
+            self.reconnects += 1
+
+    def to_json(self) -> str:
+        with self.lock:
+            return dumps(
+                {
+                    "reconnects": self.reconnects,
+                    "commands": {
+                        command: stats.to_dict()
+                        for command, stats in self.commands.items()
+                    },
+                }
+            )
+
+    def to_prometheus(self) -> str:
+        histogram = "telegods_command_latency_seconds"
+        lines = [f"# TYPE {histogram} histogram"]
+        with self.lock:
+            for command, stats in self.commands.items():
+                label = f'command="{command}"'
+                cumulative = 0
+                for bound, count in zip([*map(str, BUCKETS), "+Inf"], stats.buckets):
+                    cumulative += count
+                    lines.append(
+                        f'{histogram}_bucket{{{label},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f"{histogram}_sum{{{label}}} {stats.latency_sum}")
+                lines.append(f"{histogram}_count{{{label}}} {stats.count}")
+            for name in ("bytes_sent", "bytes_received", "timeouts", "errors"):
+                counter = f"telegods_command_{name}_total"
+                lines.append(f"# TYPE {counter} counter")
+                for command, stats in self.commands.items():
+                    value = getattr(stats, name)
+                    lines.append(f'{counter}{{command="{command}"}} {value}')
+            lines.append("# TYPE telegods_reconnects_total counter")
+            lines.append(f"telegods_reconnects_total {self.reconnects}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        # Prometheus text format for .prom files, JSON otherwise
+        with open(path, "w") as file:
+            file.write(
+                self.to_prometheus() if path.endswith(".prom") else self.to_json()
+            )
+
+
+class FrameStats:
+    def __init__(self, window: int = 120):
+        # Times of the most recent frames
+        self.times: deque[float] = deque(maxlen=window)
+        self.loop_lags: deque[float] = deque(maxlen=window)
+
+    def record_frame(self, time: float) -> None:
+        self.times.append(time)
+
+    def record_loop_lag(self, lag: float) -> None:
+        self.loop_lags.append(max(lag, 0.0))
+
+    def fps(self) -> float:
+        # Frames over the last second
+        now = perf_counter()
+        return float(sum(1 for time in self.times if now - time <= 1.0))
+
+    def average_loop_lag(self) -> float:
+        return sum(self.loop_lags) / len(self.loop_lags) if self.loop_lags else 0.0
+
+    def max_loop_lag(self) -> float:
+        return max(self.loop_lags, default=0.0)
+
+
+METRICS = Metrics()
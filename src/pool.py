@@ -0,0 +1,113 @@
+import asyncio
+from collections import OrderedDict
+from time import monotonic
+
+from client import AsyncClient
+
+PoolKey = tuple[str, str, str]
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        max_size: int = 4,
+        idle_timeout: float = 300.0,
+        heartbeat_interval: float = 15.0,
+    ):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        # Connections idle this long are checked, and replaced if dead
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_task: asyncio.Task | None = None
+        # Least recently used connections first
+        self.connections: OrderedDict[PoolKey, AsyncClient] = OrderedDict()
+        self.last_used: dict[PoolKey, float] = {}
+
+    async def acquire(
+        self, ip: str, port: str, server: str
+    ) -> tuple[int, AsyncClient | None]:
+        await self.evict_idle()
+
+        # Reuse a warm connection, skipping the TCP connect and the HI handshake
+        key = (ip, port, server)
+        client = self.connections.get(key)
+        if client is not None:
+            if client.is_alive():
+                self.touch(key)
+                return 0, client
+            await self.evict(key)
+
+        # The address may list several replicas, the fastest one is used
+        client = AsyncClient()
+        error_code, data = await client.connect_replicas(
+            client.parse_replicas(ip, port)
+        )
+        if error_code != 0 or data != server:
+            if error_code == 0:
+                await client.disconnect()
+            return 130, None
+
+        self.connections[key] = client
+        self.touch(key)
+        while len(self.connections) > self.max_size:
+            await self.evict(next(iter(self.connections)))
+        if self.heartbeat_task is None and self.heartbeat_interval:
+            self.heartbeat_task = asyncio.create_task(self.heartbeat())
+        return 0, client
+
+    def touch(self, key: PoolKey) -> None:
+        self.connections.move_to_end(key)
+        self.last_used[key] = monotonic()
+
+    def key_of(self, client: AsyncClient) -> PoolKey | None:
+        # Keyed by the address as entered, a failover may change the replica
+        for key, pooled in self.connections.items():
+            if pooled is client:
+                return key
+        return None
+
+    def release(self, client: AsyncClient) -> None:
+        # Keeps the connection warm, it is closed once idle for too long
+        key = self.key_of(client)
+        if key is not None:
+            self.last_used[key] = monotonic()
+
+    async def evict(self, key: PoolKey) -> None:
+        client = self.connections.pop(key)
+        self.last_used.pop(key, None)
+        await client.disconnect()
+
+    async def heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            now = monotonic()
+            for key, client in list(self.connections.items()):
+                # Skips the ones evicted while an earlier check was running
+                if self.connections.get(key) is not client:
+                    continue
+                if now - self.last_used[key] >= self.heartbeat_interval:
+                    # Reconnects in the background if the server went away
+                    await client.heartbeat()
+
+    async def evict_idle(self) -> None:
+        now = monotonic()
+        for key in list(self.connections):
+            if now - self.last_used[key] > self.idle_timeout:
+                await self.evict(key)
+
+    async def close(self, client: AsyncClient) -> None:
+        key = self.key_of(client)
+        if key is not None:
+            await self.evict(key)
+        else:
+            await client.disconnect()
+
+    async def close_all(self) -> None:
+        if self.heartbeat_task is not None:
+            self.heartbeat_task.cancel()
+            self.heartbeat_task = None
+        for key in list(self.connections):
+            await self.evict(key)
+
+
+POOL = ConnectionPool()
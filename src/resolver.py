@@ -0,0 +1,122 @@
+import asyncio
+from itertools import zip_longest
+from socket import SOCK_STREAM, getaddrinfo, socket
+from threading import Lock
+from time import monotonic
+
+# Family and socket address, as getaddrinfo returns them
+Address = tuple[int, tuple]
+
+# Seconds before the next address is tried while the previous one is still
+# connecting, the value recommended by RFC 8305
+HAPPY_EYEBALLS_DELAY = 0.25
+
+
+def interleave(addresses: list[Address]) -> list[Address]:
+    # Alternates address families, starting with the one the system prefers, so
+    # a broken IPv6 or IPv4 path costs a single attempt
+    families: dict[int, list[Address]] = {}
+    for address in addresses:
+        families.setdefault(address[0], []).append(address)
+    return [
+        address
+        for group in zip_longest(*families.values())
+        for address in group
+        if address is not None
+    ]
+
+
+class Resolver:
+    # getaddrinfo results kept for a while, so reconnects and replicas behind the
+    # same name skip the DNS round trip. The system resolver doesn't report the
+    # record TTL, so one fixed TTL is used for every name
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self.lock = Lock()
+        self.cache: dict[tuple[str, str], tuple[float, list[Address]]] = {}
+
+    def cached(self, host: str, port: str) -> list[Address] | None:
+        with self.lock:
+            entry = self.cache.get((host, port))
+        if entry is None or monotonic() > entry[0]:
+            return None
+        return entry[1]
+
+    def store(self, host: str, port: str, results: list) -> list[Address]:
+        addresses = interleave([(family, address) for family, *_, address in results])
+        with self.lock:
+            self.cache[(host, port)] = (monotonic() + self.ttl, addresses)
+        return addresses
+
+    def forget(self, host: str, port: str) -> None:
+        # None of the addresses answered, the name may point somewhere else now
+        with self.lock:
+            self.cache.pop((host, port), None)
+
+    def resolve(self, host: str, port: str) -> list[Address]:
+        addresses = self.cached(host, port)
+        if addresses is None:
+            addresses = self.store(
+                host, port, getaddrinfo(host, int(port), type=SOCK_STREAM)
+            )
+        return addresses
+
+    async def resolve_async(self, host: str, port: str) -> list[Address]:
+        addresses = self.cached(host, port)
+        if addresses is None:
+            results = await asyncio.get_running_loop().getaddrinfo(
+                host, int(port), type=SOCK_STREAM
+            )
+            addresses = self.store(host, port, results)
+        return addresses
+
+
+async def open_socket(family: int, address: tuple) -> socket:
+    sock = socket(family, SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        await asyncio.get_running_loop().sock_connect(sock, address)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+async def happy_eyeballs(
+    addresses: list[Address], delay: float = HAPPY_EYEBALLS_DELAY
+) -> socket:
+    # Starts a connect per address, each one when the previous one failed or
+    # after the delay, and returns the first socket to connect
+    remaining = list(addresses)
+    pending: set[asyncio.Task] = set()
+    error: BaseException | None = None
+    try:
+        while remaining or pending:
+            if remaining:
+                pending.add(asyncio.create_task(open_socket(*remaining.pop(0))))
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=delay if remaining else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            winner = None
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                elif winner is None:
+                    winner = task.result()
+                else:
+                    task.result().close()
+            if winner is not None:
+                return winner
+        raise error or OSError("No address to connect to")
+    finally:
+        for task in pending:
+            task.cancel()
+        # Cancelled attempts close their own socket, late winners are closed here
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, socket):
+                result.close()
+
+
+RESOLVER = Resolver()
@@ -0,0 +1,84 @@
+import subprocess
+import sys
+from argparse import ArgumentParser
+from os.path import abspath, dirname
+from statistics import median
+from time import perf_counter
+
+# Runs the app headless and prints when its first frame was rendered, on the
+# same system wide clock the parent process reads
+FIRST_FRAME = """
+from time import perf_counter
+
+from app import TelegodsClientApp
+
+app = TelegodsClientApp()
+# Textual's public hook, called after every frame
+app.post_display_hook = lambda: app.exit(perf_counter())
+print(app.run(headless=True))
+"""
+
+
+def time_to_first_frame(python: str) -> float:
+    start = perf_counter()
+    output = subprocess.run(
+        [python, "-c", FIRST_FRAME],
+        cwd=dirname(abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output.split()[-1]) - start
+
+
+def slowest_imports(python: str, count: int) -> list[tuple[int, str]]:
+    # Modules by their own import time in microseconds, from -X importtime
+    stderr = subprocess.run(
+        [python, "-X", "importtime", "-c", "import app"],
+        cwd=dirname(abspath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, _, name = line.split("|")
+        imports.append((int(own.split(":")[1]), name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = ArgumentParser(
+        prog="telegods-startup-bench",
+        description="Measures the time from process start to the first frame",
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--budget", type=float, default=750.0, help="ms, for the median run"
+    )
+    parser.add_argument("--imports", type=int, default=10, help="slowest to list")
+    parser.add_argument("--python", default=sys.executable)
+    args = parser.parse_args(argv)
+
+    # The first run warms the bytecode cache
+    time_to_first_frame(args.python)
+    timings = sorted(time_to_first_frame(args.python) for _ in range(args.runs))
+    result = median(timings) * 1000
+    print(
+        f"time to first frame: {result:.1f} ms median, "
+        f"{timings[0] * 1000:.1f} ms min, {timings[-1] * 1000:.1f} ms max"
+    )
+    if args.imports:
+        print("\nslowest imports")
+        for own, name in slowest_imports(args.python, args.imports):
+            print(f"  {name:<40}{own / 1000:>8.1f} ms")
+
+    if result > args.budget:
+        print(f"\nover the {args.budget:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
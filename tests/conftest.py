@@ -0,0 +1,38 @@
+import pytest
+
+from fake_server import FakeServer
+
+# Capabilities accepted by the server per protocol, the clients offer the same
+MODES = {
+    "text": ["idempotency", "ping"],
+    "binary": ["binary", "idempotency", "ping"],
+    "text-zlib": ["idempotency", "ping", "zlib"],
+    "binary-zlib": ["binary", "idempotency", "ping", "zlib"],
+}
+
+
+@pytest.fixture(autouse=True)
+def state(tmp_path, monkeypatch):
+    # Journals and catalog caches stay inside the test
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path / "state"))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+@pytest.fixture(
+    scope="session",
+    params=[(mode, fragment_size) for mode in MODES for fragment_size in (0, 7)],
+    ids=lambda param: f"{param[0]}-fragments{param[1]}",
+)
+def server(request):
+    # Every protocol, with replies written whole and split into tiny segments.
+    # Each test registers its own users, so the server is shared
+    mode, fragment_size = request.param
+    fake = FakeServer(
+        "liquor_store",
+        fragment_size=fragment_size,
+        catalog_size=300,
+        capabilities=tuple(MODES[mode]),
+        compression_threshold=64,
+    )
+    fake.start_in_thread()
+    return fake
@@ -0,0 +1,86 @@
+from array import array
+
+import pytest
+
+from binary import (
+    COMPRESSED,
+    FRAME,
+    NOT_MODIFIED,
+    catalog_items,
+    compress_frame,
+    decode_fields,
+    decode_reply,
+    decode_request,
+    encode_fields,
+    encode_reply,
+    encode_request,
+)
+
+
+def payload(frame: bytes) -> bytes:
+    (size,) = FRAME.unpack_from(frame)
+    assert size == len(frame) - FRAME.size
+    return frame[FRAME.size :]
+
+
+def test_every_field_type_round_trips():
+    fields = [
+        -(2**40),
+        3.5,
+        "con espacios y ñ",
+        "",
+        array("i", [1, -2, 3]),
+        array("d", [0.5, 2.25]),
+        ["a", "b c", "ü"],
+        [],
+    ]
+    assert decode_fields(memoryview(encode_fields(fields))) == fields
+
+
+def test_requests_round_trip():
+    frame = encode_request("TRANSFER", ["sender", "receiver", 25, "key"])
+    assert decode_request(payload(frame)) == (
+        "TRANSFER",
+        ["sender", "receiver", 25, "key"],
+    )
+
+
+def test_replies_decode_like_split_text_replies():
+    assert decode_reply(payload(encode_reply(0, [120]))) == ["OK", 120]
+    assert decode_reply(payload(encode_reply(3, []))) == ["ERROR", 3]
+    not_modified = encode_reply(NOT_MODIFIED, ["v42"])
+    assert decode_reply(payload(not_modified)) == ["NOTMODIFIED", "v42"]
+
+
+def test_compressed_frames_flag_their_length():
+    frame = encode_reply(0, ["x" * 1000])
+    compressed = compress_frame(frame)
+    (size,) = FRAME.unpack_from(compressed)
+    assert size & COMPRESSED
+    assert size & ~COMPRESSED == len(compressed) - FRAME.size < len(frame)
+
+
+def test_unknown_field_types_are_rejected():
+    with pytest.raises(ValueError):
+        decode_fields(memoryview(b"z"))
+
+
+def test_catalog_columns_become_json_like_items():
+    fields = [
+        ["u1", "u2"],
+        ["Ron", "Vino"],
+        ["CU", "CL"],
+        array("i", [4, 0]),
+        array("d", [10.5, 7.0]),
+        2,
+        "owner",
+        "v42",
+    ]
+    items, version = catalog_items(fields)
+    assert items == [
+        ["u1", "Ron", "CU", 4, 10.5],
+        ["u2", "Vino", "CL", 0, 7.0],
+        2,
+        "owner",
+    ]
+    assert version == "v42"
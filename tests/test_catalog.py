@@ -0,0 +1,71 @@
+import pytest
+
+from catalog import Catalog, SearchIndex
+from fake_server import make_catalog
+
+ROWS = make_catalog(500, seed=3)
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    catalog = Catalog()
+    # Streamed in batches, like the catalog screen receives it
+    for start in range(0, len(ROWS), 128):
+        catalog.extend(ROWS[start : start + 128])
+    return catalog
+
+
+def expected_view(sort, max_price, in_stock, query):
+    rows = [
+        number
+        for number, row in enumerate(ROWS)
+        if (max_price is None or row[4] <= max_price)
+        and (not in_stock or row[3] > 0)
+        and (not query or query.casefold() in f"{row[1]} {row[2]}".casefold())
+    ]
+    if sort == "name":
+        rows.sort(key=lambda number: ROWS[number][1].casefold())
+    elif sort is not None:
+        column = 4 if sort == "price" else 3
+        rows.sort(key=lambda number: ROWS[number][column])
+    return rows
+
+
+@pytest.mark.parametrize("sort", [None, "name", "price", "stock"])
+@pytest.mark.parametrize("max_price", [None, 100.0])
+@pytest.mark.parametrize("in_stock", [False, True])
+@pytest.mark.parametrize("query", ["", "vodka_1", "ron"])
+def test_view_matches_a_brute_force_filter(catalog, sort, max_price, in_stock, query):
+    matches = catalog.search(query)
+    view = list(catalog.view(sort, max_price, in_stock, matches))
+    expected = expected_view(sort, max_price, in_stock, query)
+    if sort is None:
+        assert view == expected
+    else:
+        # Rows with equal keys may come in any order
+        column = {"name": 1, "price": 4, "stock": 3}[sort]
+        assert sorted(view) == sorted(expected)
+        keys = [ROWS[number][column] for number in view]
+        if sort == "name":
+            keys = [key.casefold() for key in keys]
+        assert keys == sorted(keys)
+
+
+def test_rows_are_found_by_uuid(catalog):
+    assert catalog.get(ROWS[42][0]) == ROWS[42]
+    assert catalog.get("missing") is None
+    assert len(catalog) == len(ROWS)
+
+
+def test_search_uses_prefixes_for_short_queries_and_substrings_otherwise():
+    index = SearchIndex()
+    for number, name in enumerate(["Ron Viejo", "Vino Tinto", "Aguardiente", "Vodka"]):
+        index.add(number, name, "CO")
+    assert index.search("") is None
+    assert index.search("v") == [0, 1, 3]
+    assert index.search("ti") == [1]
+    assert index.search("gua") == [2]
+    # Each keystroke narrows the previous matches
+    assert index.search("vie") == [0]
+    assert index.search("viej") == [0]
+    assert index.search("vieja") == []
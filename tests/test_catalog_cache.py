@@ -0,0 +1,54 @@
+import hashlib
+import os
+
+from catalog import Catalog
+from catalog_cache import CatalogCache
+from fake_server import make_catalog
+
+
+def test_catalogs_round_trip():
+    catalog = Catalog(make_catalog(100, seed=1))
+    catalog.extend([["u-ñ", "Pisco con ñ", "PE", 7, 19.99]])
+    # A full SHA-256 version, longer than the old fixed width field
+    version = hashlib.sha256(b"catalog").hexdigest()
+    CatalogCache("127.0.0.1", "8888").save(catalog, version, "owner")
+
+    cache = CatalogCache("127.0.0.1", "8888")
+    loaded = cache.load()
+    assert cache.version == version
+    assert cache.owner_uuid == "owner"
+    assert [loaded.row(n) for n in range(len(loaded))] == [
+        catalog.row(n) for n in range(len(catalog))
+    ]
+    assert cache.is_fresh()
+
+
+def test_empty_catalogs_round_trip():
+    CatalogCache("127.0.0.1", "8888").save(Catalog(), "v1", "owner")
+    loaded = CatalogCache("127.0.0.1", "8888").load()
+    assert loaded is not None and len(loaded) == 0
+
+
+def test_missing_truncated_and_foreign_files_are_ignored():
+    cache = CatalogCache("127.0.0.1", "8888")
+    assert cache.load() is None
+
+    cache.save(Catalog(make_catalog(10)), "v1", "owner")
+    with open(cache.path, "rb") as file:
+        data = file.read()
+    with open(cache.path, "wb") as file:
+        file.write(data[: len(data) // 2])
+    assert cache.load() is None
+
+    with open(cache.path, "wb") as file:
+        file.write(b"XXXX" + data[4:])
+    assert cache.load() is None
+
+
+def test_old_caches_are_stale():
+    cache = CatalogCache("127.0.0.1", "8888", ttl=60)
+    cache.save(Catalog(make_catalog(10)), "v1", "owner")
+    os.utime(cache.path, (0, 0))
+    assert not cache.is_fresh()
+    cache.touch()
+    assert cache.is_fresh()
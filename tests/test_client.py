@@ -0,0 +1,165 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from client import AsyncClient, Client
+from fake_server import FakeServer
+
+
+def connect(server) -> Client:
+    client = Client()
+    client.CAPABILITIES = list(server.capabilities)
+    assert client.connect("127.0.0.1", str(server.port)) == (0, "liquor_store")
+    return client
+
+
+async def connect_async(server) -> AsyncClient:
+    client = AsyncClient()
+    client.CAPABILITIES = list(server.capabilities)
+    assert await client.connect("127.0.0.1", str(server.port)) == (0, "liquor_store")
+    return client
+
+
+def negotiated(client, server) -> None:
+    assert client.binary == ("binary" in server.capabilities)
+    assert client.compression == ("zlib" in server.capabilities)
+    assert client.idempotency
+
+
+def sign_up(client: Client) -> str:
+    username = uuid4().hex
+    assert client.register(username, "secret") == (0, "")
+    error_code, uuid = client.login(username, "secret")
+    assert error_code == 0
+    return uuid
+
+
+async def sign_up_async(client: AsyncClient) -> str:
+    username = uuid4().hex
+    assert await client.register(username, "secret") == (0, "")
+    error_code, uuid = await client.login(username, "secret")
+    assert error_code == 0
+    return uuid
+
+
+def test_money_moves_once_per_command(server):
+    client = connect(server)
+    negotiated(client, server)
+    uuid = sign_up(client)
+    other = connect(server)
+    other_uuid = sign_up(other)
+
+    assert client.deposit(uuid, "100") == (0, "")
+    assert client.withdraw(uuid, "30") == (0, "")
+    assert client.withdraw(uuid, "1000") == (3, "")
+    assert client.transfer(uuid, other_uuid, "20") == (0, "")
+    assert client.transfer(uuid, "missing", "1") == (252, "")
+    assert client.balance(refresh=True) == (0, "50")
+    assert other.balance(refresh=True) == (0, "20")
+    assert server.balances[uuid] == 50
+    assert client.journal.pending(uuid) == []
+
+
+def test_refusals_report_the_server_error(server):
+    client = connect(server)
+    assert client.balance(refresh=True) == (251, "")
+    sign_up(client)
+    client.balance(refresh=True)
+    assert client.deposit(str(uuid4()), "5") == (251, "")
+    # The cached balance can't be trusted after a refusal
+    assert client.balance_cache is None
+
+
+def test_pipelined_replies_resolve_in_order(server):
+    client = connect(server)
+    uuid = sign_up(client)
+    with client.pipeline():
+        deposit = client.deposit(uuid, "10")
+        withdrawal = client.withdraw(uuid, "50")
+        balance = client.balance()
+    assert deposit.result() == (0, "")
+    assert withdrawal.result() == (3, "")
+    assert balance.result() == (0, "10")
+
+
+def test_the_catalog_arrives_whole(server):
+    client = connect(server)
+    error_code, items = client.list_liquors()
+    assert error_code == 0
+    assert items[:-2] == server.catalog
+    assert items[-1] == server.owner_uuid
+
+
+def test_streamed_catalog_matches_the_server(server):
+    async def stream():
+        client = await connect_async(server)
+        rows = []
+        async for error_code, items in client.stream_liquors(chunk_size=512):
+            assert error_code == 0
+            rows += items
+        assert client.catalog_modified
+        version = client.catalog_version
+        assert version == server.catalog_version
+
+        # The same version again only confirms the catalog
+        batches = [batch async for batch in client.stream_liquors(version)]
+        assert batches == []
+        assert not client.catalog_modified
+        await client.disconnect()
+        return rows
+
+    rows = asyncio.run(stream())
+    assert rows[:-2] == server.catalog
+    assert rows[-1] == server.owner_uuid
+
+
+def test_a_lost_reply_is_resent_with_its_key_and_applied_once(server):
+    async def run():
+        client = await connect_async(server)
+        uuid = await sign_up_async(client)
+        read_reply = client._read_reply
+
+        async def lost_reply():
+            # The server applies the deposit, its reply never arrives
+            await asyncio.sleep(0.05)
+            client._read_reply = read_reply
+            raise ConnectionResetError("reply lost")
+
+        client._read_reply = lost_reply
+        reconnects = client.metrics.reconnects
+        assert await client.deposit(uuid, "10") == (0, "")
+        assert client.metrics.reconnects == reconnects + 1
+        assert await client.balance(refresh=True) == (0, "10")
+        assert await asyncio.to_thread(client.journal.pending, uuid) == []
+        await client.disconnect()
+
+    asyncio.run(run())
+
+
+def test_journaled_commands_are_replayed_at_login(server):
+    client = connect(server)
+    username = uuid4().hex
+    client.register(username, "secret")
+    _, uuid = client.login(username, "secret")
+    # Left by a client that crashed before the reply arrived
+    client.journal.add("DEPOSIT", (uuid, 7))
+    client.logout()
+
+    again = connect(server)
+    assert again.login(username, "secret") == (0, uuid)
+    assert again.balance(refresh=True) == (0, "7")
+    assert again.journal.pending(uuid) == []
+
+
+@pytest.mark.parametrize("capabilities", [[], ["binary", "zlib", "unknown"]])
+def test_older_servers_fall_back_to_plain_text(capabilities):
+    server = FakeServer("bank", capabilities=())
+    port = str(server.start_in_thread())
+    client = Client()
+    client.CAPABILITIES = capabilities
+    assert client.connect("127.0.0.1", port) == (0, "bank")
+    assert not client.binary and not client.compression and not client.idempotency
+    uuid = sign_up(client)
+    assert client.deposit(uuid, "5") == (0, "")
+    assert client.balance(refresh=True) == (0, "5")
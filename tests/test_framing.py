@@ -0,0 +1,94 @@
+import json
+import socket
+import zlib
+
+import pytest
+
+from framing import COMPRESSED, DELIMITER, JsonArrayParser, LineReader, compress_line
+
+
+def feed_all(parser: JsonArrayParser, data: bytes, chunk_size: int) -> list:
+    items = []
+    for start in range(0, len(data), chunk_size):
+        items += parser.feed(data[start : start + chunk_size])
+    return items
+
+
+@pytest.fixture
+def pair():
+    left, right = socket.socketpair()
+    yield left, right
+    left.close()
+    right.close()
+
+
+def test_readline_finds_a_delimiter_split_between_segments(pair):
+    left, right = pair
+    reader = LineReader(left, chunk_size=4)
+    right.sendall(b"OK 12\r")
+    right.sendall(b"\nOK 3\r\nERR")
+    assert reader.readline() == b"OK 12"
+    assert reader.readline() == b"OK 3"
+    right.sendall(b"OR 251\r\n")
+    assert reader.readline() == b"ERROR 251"
+
+
+def test_readexactly_keeps_the_rest_for_the_next_read(pair):
+    left, right = pair
+    reader = LineReader(left, chunk_size=3)
+    right.sendall(b"abcdefgh\r\n")
+    assert reader.readexactly(5) == b"abcde"
+    assert reader.readline() == b"fgh"
+
+
+def test_reads_fail_once_the_peer_closes(pair):
+    left, right = pair
+    reader = LineReader(left)
+    right.sendall(b"partial")
+    right.close()
+    with pytest.raises(ConnectionResetError):
+        reader.readline()
+
+
+def test_compress_line_is_a_header_and_a_zlib_stream():
+    line = b"OK " + b"x" * 1000 + DELIMITER
+    header, data = compress_line(line).split(DELIMITER, 1)
+    assert header.startswith(COMPRESSED)
+    assert int(header[len(COMPRESSED) :]) == len(data)
+    assert zlib.decompress(data) == line
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 64, 4096])
+def test_parser_yields_every_item_whatever_the_chunking(chunk_size):
+    items = [["a1", "Ron ñandú", "CO", 12, 45.5], ["b2", "Vino", "CL", 0, 7.25], 3]
+    items.append("owner-uuid")
+    reply = f"OK {json.dumps(items)} v42\r\n".encode("utf-8")
+    parser = JsonArrayParser()
+    assert feed_all(parser, reply, chunk_size) == items
+    assert parser.done and not parser.not_modified
+    assert parser.error_code == 0
+    assert parser.trailer == "v42"
+
+
+def test_parser_waits_for_a_number_that_may_continue():
+    parser = JsonArrayParser()
+    assert parser.feed(b"OK [12") == []
+    assert parser.feed(b"34,") == [1234]
+    assert parser.feed(b"5]\r\n") == [5]
+    assert parser.done and parser.trailer == ""
+
+
+def test_parser_reports_not_modified_and_errors():
+    parser = JsonArrayParser()
+    assert feed_all(parser, b"NOTMODIFIED v42\r\n", 3) == []
+    assert parser.done and parser.not_modified
+    assert parser.trailer == "v42"
+
+    parser = JsonArrayParser()
+    assert parser.feed(b"ERROR 251\r\n") == []
+    assert parser.done and parser.error_code == 251
+
+
+def test_parser_rejects_a_reply_without_an_array():
+    with pytest.raises(ValueError):
+        JsonArrayParser().feed(b'OK {"a": 1}\r\n')
@@ -0,0 +1,53 @@
+import json
+from time import time
+
+from journal import Journal
+
+
+def test_journals_sharing_a_file_keep_each_others_entries():
+    first = Journal("127.0.0.1", "8888")
+    second = Journal("127.0.0.1", "8888")
+    deposit = first.add("DEPOSIT", ("owner", 10))
+    withdrawal = second.add("WITH", ("owner", 3))
+    assert set(Journal("127.0.0.1", "8888").entries) == {deposit, withdrawal}
+
+    first.remove(deposit)
+    assert [key for key, *_ in second.pending("owner")] == [withdrawal]
+
+
+def test_pending_is_oldest_first_and_per_account():
+    journal = Journal("127.0.0.1", "8888")
+    keys = [journal.add("DEPOSIT", ("owner", amount)) for amount in (1, 2, 3)]
+    journal.add("DEPOSIT", ("someone else", 4))
+    assert journal.pending("owner") == [
+        (key, "DEPOSIT", ["owner", amount]) for key, amount in zip(keys, (1, 2, 3))
+    ]
+
+
+def test_removals_reach_the_file_with_the_next_write():
+    journal = Journal("127.0.0.1", "8888")
+    key = journal.add("DEPOSIT", ("owner", 10))
+    journal.remove(key)
+    assert journal.entries == {}
+    journal.pending("owner")
+    with open(journal.path, encoding="utf-8") as file:
+        assert json.load(file) == {}
+
+
+def test_old_entries_are_dropped():
+    journal = Journal("127.0.0.1", "8888", max_age=60)
+    journal.add("DEPOSIT", ("owner", 10))
+    with open(journal.path, encoding="utf-8") as file:
+        entries = json.load(file)
+    entries["stale"] = ["DEPOSIT", ["owner", 5], time() - 120]
+    with open(journal.path, "w", encoding="utf-8") as file:
+        json.dump(entries, file)
+    assert [args for _, _, args in journal.pending("owner")] == [["owner", 10]]
+
+
+def test_a_corrupt_file_reads_as_empty():
+    journal = Journal("127.0.0.1", "8888")
+    journal.add("DEPOSIT", ("owner", 10))
+    with open(journal.path, "w", encoding="utf-8") as file:
+        file.write("{not json")
+    assert Journal("127.0.0.1", "8888").pending("owner") == []